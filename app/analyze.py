@@ -0,0 +1,286 @@
+# Import necessary libraries
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from checkpoint import DEFAULT_STATE_PATH
+from dialects import dialect_for_connection
+from metrics import span, increment
+from schemacache import SCHEMA_CACHE, describe_database
+
+DEFAULT_BINS = 20
+DEFAULT_TOP_LIMIT = 10
+
+NUMERIC_TYPES = {'tinyint', 'smallint', 'mediumint', 'int', 'integer', 'bigint', 'decimal', 'numeric',
+                 'float', 'double', 'real', 'money', 'smallmoney'}
+TEMPORAL_TYPES = {'date', 'datetime', 'datetime2', 'smalldatetime', 'datetimeoffset', 'timestamp', 'time', 'year'}
+
+SUMMARY_COLUMNS = ['column', 'type', 'count', 'nulls', 'min', 'max', 'mean', 'stddev', 'max_length']
+
+# Local store of analysis results, reused while the table they were computed from is unchanged
+class AnalysisCache:
+    """Keeps query results in the local state database, keyed by the query and target database.
+
+    Each result records the table version it was computed from; a lookup only hits when the
+    table's current version is the same. Tables whose version the server cannot report are
+    only served from the cache for max_age seconds.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or os.environ.get("CENTERSPOKE_STATE_DB", DEFAULT_STATE_PATH)
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self.db = sqlite3.connect(self.path)
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS analysis_results ("
+            "cache_key TEXT PRIMARY KEY, table_version TEXT, created_at REAL NOT NULL, result TEXT NOT NULL)"
+        )
+        self.db.commit()
+
+    def get(self, cache_key, version, max_age=0):
+        row = self.db.execute(
+            "SELECT table_version, created_at, result FROM analysis_results WHERE cache_key = ?", (cache_key,)
+        ).fetchone()
+        if row is None:
+            return None
+        stored_version, created_at, result = row
+        if version is not None:
+            fresh = stored_version == version
+        else:
+            fresh = time.time() - created_at < max_age
+        return json.loads(result) if fresh else None
+
+    def put(self, cache_key, version, result):
+        self.db.execute(
+            "INSERT OR REPLACE INTO analysis_results (cache_key, table_version, created_at, result) VALUES (?, ?, ?, ?)",
+            (cache_key, version, time.time(), json.dumps(result, default=str))
+        )
+        self.db.commit()
+
+    def close(self):
+        self.db.close()
+
+# Function to read a token that changes whenever a table's data changes, or None if the server has none
+def get_table_version(connection, table_name, dialect=None):
+    dialect = dialect or dialect_for_connection(connection)
+    query, params = dialect.table_version_query(table_name)
+    cursor = connection.cursor()
+    try:
+        if dialect.table_version_setup_sql:
+            try:
+                cursor.execute(dialect.table_version_setup_sql)
+            except Exception:
+                # Servers without the setting (MySQL 5.7, MariaDB) do not cache these values
+                pass
+        cursor.execute(query, params)
+        row = cursor.fetchone()
+    finally:
+        cursor.close()
+    if row is None or row[0] is None:
+        return None
+    return json.dumps(list(row), default=str)
+
+# Function to look up the metadata of the columns an analysis refers to
+def resolve_columns(connection, table_name, names=None):
+    """Returns the schema cache entries for names (all columns when names is None), failing on unknown names."""
+    table = SCHEMA_CACHE.table(connection, table_name)
+    if table is None:
+        table = SCHEMA_CACHE.table(connection, table_name, refresh=True)
+    if table is None:
+        raise ValueError(f"Table '{table_name}' does not exist")
+
+    by_name = {column['name']: column for column in table['columns']}
+    if names is None:
+        return table['columns']
+    unknown = [name for name in names if name not in by_name]
+    if unknown:
+        raise ValueError(f"Unknown columns in '{table_name}': {', '.join(unknown)}")
+    return [by_name[name] for name in names]
+
+# Function to add an optional filter to a FROM clause
+def from_clause(dialect, table_name, where=None, extra_condition=None):
+    conditions = [condition for condition in (extra_condition, f"({where})" if where else None) if condition]
+    clause = f"FROM {dialect.quote(table_name)}"
+    if conditions:
+        clause += " WHERE " + " AND ".join(conditions)
+    return clause
+
+# Function to build one query computing summary statistics for many columns
+def build_summary_query(dialect, table_name, columns, where=None):
+    """Returns (sql, layout) where layout lists, per column, which output position holds each statistic."""
+    select_list = ['COUNT(*)']
+    layout = []
+    for column in columns:
+        quoted = dialect.quote(column['name'])
+        kind = column['type'].lower()
+        functions = ['count', 'min', 'max']
+        if kind in NUMERIC_TYPES:
+            functions += ['avg', 'stddev']
+        elif kind not in TEMPORAL_TYPES:
+            functions += ['length']
+
+        positions = {}
+        for function in functions:
+            positions[function] = len(select_list)
+            select_list.append(dialect.aggregate(function, quoted))
+        layout.append((column, positions))
+
+    return dialect.select_limited(', '.join(select_list), from_clause(dialect, table_name, where)), layout
+
+# Function to turn the single row of a summary query into one row per column
+def summary_rows(row, layout):
+    total = row[0]
+    rows = []
+    for column, positions in layout:
+        value = {function: row[position] for function, position in positions.items()}
+        rows.append([
+            column['name'], column['type'], value['count'], total - value['count'],
+            value['min'], value['max'], value.get('avg'), value.get('stddev'), value.get('length'),
+        ])
+    return rows
+
+# Function to build a GROUP BY query with the aggregates computed on the server
+def build_group_by_query(dialect, table_name, group_columns, aggregates, where=None, limit=None):
+    """aggregates is a list of (function, column) pairs; groups come back largest first."""
+    keys = ', '.join([dialect.quote(name) for name in group_columns])
+    select_list = [keys, "COUNT(*) AS row_count"]
+    labels = list(group_columns) + ['rows']
+    for function, column_name in aggregates:
+        select_list.append(dialect.aggregate(function, dialect.quote(column_name)))
+        labels.append(f"{function}({column_name})")
+    rest = f"{from_clause(dialect, table_name, where)} GROUP BY {keys} ORDER BY row_count DESC"
+    return dialect.select_limited(', '.join(select_list), rest, limit), labels
+
+# Function to build a query that counts the values of a numeric column in equal-width bins
+def build_histogram_query(dialect, table_name, column_name, bins=DEFAULT_BINS, where=None):
+    """Returns rows of (bin, count, lowest value, highest value); bins without values are left out."""
+    quoted = dialect.quote(column_name)
+    bounds = dialect.select_limited(f"MIN({quoted}) AS lo, MAX({quoted}) AS hi",
+                                    from_clause(dialect, table_name, where)).rstrip(';')
+    # The maximum itself goes in the last bin rather than a bin of its own
+    bin_expression = (
+        f"CASE WHEN s.hi = s.lo THEN 0 WHEN {quoted} >= s.hi THEN {bins - 1} "
+        f"ELSE FLOOR(({quoted} - s.lo) * {bins} / (s.hi - s.lo)) END"
+    )
+    inner = (
+        f"SELECT {bin_expression} AS bin, s.lo AS lo, s.hi AS hi "
+        f"FROM {dialect.quote(table_name)} CROSS JOIN ({bounds}) s "
+        f"WHERE {quoted} IS NOT NULL" + (f" AND ({where})" if where else '')
+    )
+    return dialect.select_limited("bin, COUNT(*), MIN(lo), MIN(hi)", f"FROM ({inner}) b GROUP BY bin ORDER BY bin")
+
+# Function to turn histogram query rows into labelled bins
+def histogram_rows(rows, bins):
+    result = []
+    for bin_index, count, low, high in rows:
+        low, high = float(low), float(high)
+        width = (high - low) / bins
+        start = low + int(bin_index) * width
+        end = high if int(bin_index) == bins - 1 else start + width
+        result.append([int(bin_index), start, end, count])
+    return result
+
+# Function to build a query for the most frequent values of a column
+def build_top_query(dialect, table_name, column_name, limit=DEFAULT_TOP_LIMIT, where=None):
+    quoted = dialect.quote(column_name)
+    rest = f"{from_clause(dialect, table_name, where)} GROUP BY {quoted} ORDER BY row_count DESC"
+    return dialect.select_limited(f"{quoted}, COUNT(*) AS row_count", rest, limit)
+
+# Function to run an analysis query, answering from the local cache while the table is unchanged
+def run_cached_query(connection, query, version, cache=None, max_age=0):
+    cache_key = hashlib.sha1(f"{describe_database(connection)}\n{query}".encode('utf-8')).hexdigest()
+    if cache is not None:
+        rows = cache.get(cache_key, version, max_age)
+        if rows is not None:
+            increment('analyze.cache_hits')
+            return rows, True
+
+    cursor = connection.cursor()
+    try:
+        with span('analyze.query'):
+            cursor.execute(query)
+            rows = [list(row) for row in cursor.fetchall()]
+    finally:
+        cursor.close()
+    increment('analyze.queries')
+
+    if cache is not None:
+        cache.put(cache_key, version, rows)
+    return rows, False
+
+# Function to print rows as an aligned text table
+def print_table(title, columns, rows):
+    text_rows = [["" if value is None else str(value) for value in row] for row in rows]
+    widths = [max([len(column)] + [len(row[i]) for row in text_rows]) for i, column in enumerate(columns)]
+    print(title)
+    print("  ".join(column.ljust(width) for column, width in zip(columns, widths)))
+    for row in text_rows:
+        print("  ".join(value.ljust(width) for value, width in zip(row, widths)))
+    print()
+
+# Function to parse 'sum:amount,avg:price' into (function, column) pairs
+def parse_aggregates(spec):
+    aggregates = []
+    for item in filter(None, [part.strip() for part in (spec or '').split(',')]):
+        function, _, column_name = item.partition(':')
+        if not column_name:
+            raise ValueError(f"Aggregate '{item}' should look like function:column, e.g. sum:amount")
+        aggregates.append((function.strip().lower(), column_name.strip()))
+    return aggregates
+
+# Function to summarise a table with the work done by the database
+def analyze_table(connection, table_name, columns=None, where=None, group_by=None, aggregates=None, histogram=None,
+                  bins=DEFAULT_BINS, top=None, limit=DEFAULT_TOP_LIMIT, use_cache=True, max_age=0, as_json=False):
+    """Runs the requested analyses on the server and prints their (small) results.
+
+    Summary statistics are computed when no group-by, histogram or top-N analysis is asked for.
+    Results are cached locally and reused while the table version the server reports is
+    unchanged; with no version available they are reused for max_age seconds.
+    """
+    dialect = dialect_for_connection(connection)
+    aggregates = aggregates or []
+    group_by = group_by or []
+
+    # Column names are checked against the schema cache so a typo fails before any query runs
+    selected = resolve_columns(connection, table_name, columns)
+    resolve_columns(connection, table_name, group_by + [name for _, name in aggregates]
+                    + [name for name in (histogram, top) if name])
+    if histogram and resolve_columns(connection, table_name, [histogram])[0]['type'].lower() not in NUMERIC_TYPES:
+        raise ValueError(f"Histograms need a numeric column; '{histogram}' is not one")
+
+    version = get_table_version(connection, table_name, dialect)
+    if version is None and use_cache and not max_age:
+        print(f"The server does not report a version for '{table_name}', so results are not cached (see --max-age).")
+    cache = AnalysisCache() if use_cache else None
+    results = []
+    try:
+        if group_by:
+            query, labels = build_group_by_query(dialect, table_name, group_by, aggregates, where, limit)
+            rows, cached = run_cached_query(connection, query, version, cache, max_age)
+            results.append((f"Group by {', '.join(group_by)}", labels, rows, cached))
+
+        if histogram:
+            rows, cached = run_cached_query(connection, build_histogram_query(dialect, table_name, histogram, bins, where),
+                                            version, cache, max_age)
+            results.append((f"Histogram of {histogram}", ['bin', 'from', 'to', 'rows'], histogram_rows(rows, bins), cached))
+
+        if top:
+            rows, cached = run_cached_query(connection, build_top_query(dialect, table_name, top, limit, where),
+                                            version, cache, max_age)
+            results.append((f"Top {limit} values of {top}", [top, 'rows'], rows, cached))
+
+        if not (group_by or histogram or top):
+            query, layout = build_summary_query(dialect, table_name, selected, where)
+            rows, cached = run_cached_query(connection, query, version, cache, max_age)
+            results.append((f"Summary of {table_name}", SUMMARY_COLUMNS, summary_rows(rows[0], layout), cached))
+    finally:
+        if cache is not None:
+            cache.close()
+
+    if as_json:
+        print(json.dumps([{'title': title, 'columns': labels, 'rows': rows, 'cached': cached}
+                          for title, labels, rows, cached in results], default=str, indent=2))
+    else:
+        for title, labels, rows, cached in results:
+            print_table(title + (" (cached)" if cached else ""), labels, rows)
+    return results
@@ -0,0 +1,132 @@
+# Import necessary libraries
+from connectdatabase import get_connection_pool, close_all_pools, DEFAULT_FETCH_SIZE
+from dialects import MYSQL
+from analyze import DEFAULT_BINS, DEFAULT_TOP_LIMIT
+from uploadcommand import add_upload_arguments, check_upload_arguments, run_upload_session
+
+# Function to add the AWS RDS options and actions to the 'aws' subcommand
+def add_arguments(aws_db_parser):
+    aws_db_parser.add_argument("--database-endpoint", help="AWS RDS database instance identifier")
+    aws_db_parser.add_argument("--database-name", help="Database Name")
+    aws_db_parser.add_argument("--port", help="Port Number")
+    aws_db_parser.add_argument("--username", help="Database username")
+    aws_db_parser.add_argument("--password", help="Database password")
+    add_upload_arguments(aws_db_parser, MYSQL.load_strategies)
+
+    # Add subparser for AWS function
+    aws_db_subparsers = aws_db_parser.add_subparsers(dest='aws_action', help='AWS action to perform')
+
+    # Create database via AWS RDS
+    create_aws_db_parser = aws_db_subparsers.add_parser('newdatabase', help="Create a new database in AWS RDS")
+    create_aws_db_parser.add_argument("--new-database-name", help="Name of the new database to create")
+
+    # Create table via AWS RDS database
+    create_aws_table_parser = aws_db_subparsers.add_parser('createtable', help="Create a new table in AWS RDS")
+    create_aws_table_parser.add_argument("--table-name", help="Name of the new table to create")
+
+    # Upload many workbooks/sheets via AWS RDS without prompts
+    batch_aws_upload_parser = aws_db_subparsers.add_parser('batchupload', help="Upload many Excel sheets to AWS RDS in parallel")
+    batch_aws_upload_parser.add_argument("--manifest", help="CSV or JSON manifest with file, sheet and table entries")
+    batch_aws_upload_parser.add_argument("--glob", help="Glob of Excel files; every sheet of every file is uploaded")
+    batch_aws_upload_parser.add_argument("--table-template", default="{sheet}", help="Table name template for sheets without an explicit table, e.g. '{file}_{sheet}'")
+    batch_aws_upload_parser.add_argument("--workers", type=int, help="Number of processes parsing Excel files (default: CPU count)")
+    batch_aws_upload_parser.add_argument("--db-connections", type=int, default=4, help="Number of database connections used for inserts")
+    batch_aws_upload_parser.add_argument("--create-tables", action="store_true", help="Create missing tables from the sheet structure")
+
+    # Export a table or query result via AWS RDS
+    export_aws_parser = aws_db_subparsers.add_parser('export', help="Export a table or query result from AWS RDS to a file")
+    export_aws_parser.add_argument("--table", help="Table to export")
+    export_aws_parser.add_argument("--query", help="SQL query whose result is exported instead of a table")
+    export_aws_parser.add_argument("--output", required=True, help="Output file (.csv, .txt, .json, .jsonl, .xml, .xlsx or .parquet)")
+    export_aws_parser.add_argument("--parallel", type=int, default=1, help="Read a table over this many connections, split by primary key range")
+    export_aws_parser.add_argument("--fetch-size", type=int, default=DEFAULT_FETCH_SIZE, help="Rows fetched from the server per round trip")
+
+    # Analyze a table on the server via AWS RDS
+    analyze_aws_parser = aws_db_subparsers.add_parser('analyze', help="Compute statistics of a table in AWS RDS on the server")
+    analyze_aws_parser.add_argument("--table", required=True, help="Table to analyze")
+    analyze_aws_parser.add_argument("--columns", help="Comma-separated columns to summarize (default: all)")
+    analyze_aws_parser.add_argument("--where", help="SQL condition restricting the rows analyzed")
+    analyze_aws_parser.add_argument("--group-by", help="Comma-separated columns to group by")
+    analyze_aws_parser.add_argument("--aggregates", help="Aggregates per group, e.g. 'sum:amount,avg:price' (count, distinct, sum, avg, min, max, stddev)")
+    analyze_aws_parser.add_argument("--histogram", help="Numeric column to count in equal-width bins")
+    analyze_aws_parser.add_argument("--bins", type=int, default=DEFAULT_BINS, help="Number of histogram bins")
+    analyze_aws_parser.add_argument("--top", help="Column whose most frequent values are listed")
+    analyze_aws_parser.add_argument("--limit", type=int, default=DEFAULT_TOP_LIMIT, help="Rows returned by --top and --group-by")
+    analyze_aws_parser.add_argument("--no-cache", action="store_true", help="Always query the server instead of reusing cached results")
+    analyze_aws_parser.add_argument("--max-age", type=float, default=0, help="Seconds cached results stay valid when the server reports no table version")
+    analyze_aws_parser.add_argument("--json", action="store_true", help="Print the results as JSON")
+
+def run(args, parser):
+    # AWS RDS database connection setup
+    database_name = args.database_name or input("Enter database name: ")
+    database_endpoint = args.database_endpoint or input("Enter the AWS RDS database instance identifier: ")
+    username = args.username or input("Enter the database username: ")
+    password = args.password or input("Enter the database password: ")
+    port = args.port or input("Enter port: ")
+
+    check_upload_arguments(args, parser)
+
+    allow_local_infile = args.load_strategy in ('auto', 'load-data')
+
+    # Every step of the session borrows from one pool instead of opening its own connection
+    pool = get_connection_pool('aws', database_name, username, password, database_endpoint, port,
+                               allow_local_infile=allow_local_infile, pool_size=args.pool_size)
+
+    if args.aws_action == 'batchupload':
+        # Imported here so '--help' and the other actions do not load pandas
+        from batchupload import load_manifest, jobs_from_glob, run_batch_upload, print_batch_summary
+
+        if args.manifest:
+            jobs = load_manifest(args.manifest, args.table_template)
+        elif args.glob:
+            jobs = jobs_from_glob(args.glob, args.table_template)
+        else:
+            parser.error("batchupload needs --manifest or --glob")
+
+        load_options = {'strategy': args.load_strategy, 'batch_size': args.batch_size, 'commit_every': args.commit_every}
+        pool.pool_size = max(pool.pool_size, args.db_connections)
+        results = run_batch_upload(
+            jobs,
+            pool,
+            parse_workers=args.workers,
+            db_connections=args.db_connections,
+            create_tables=args.create_tables,
+            load_options=load_options,
+            use_cache=not args.no_cache
+        )
+        print_batch_summary(results)
+        close_all_pools()
+        return
+
+    if args.aws_action == 'export':
+        from export import export_data
+
+        pool.pool_size = max(pool.pool_size, args.parallel)
+        try:
+            export_data(pool, args.output, table_name=args.table, query=args.query,
+                        parallel=args.parallel, fetch_size=args.fetch_size)
+        except Exception as e:
+            print(f"Error exporting data: {e}")
+        close_all_pools()
+        return
+
+    if args.aws_action == 'analyze':
+        from analyze import analyze_table, parse_aggregates
+
+        if args.aggregates and not args.group_by:
+            parser.error("--aggregates needs --group-by")
+        try:
+            with pool.connection() as connection:
+                analyze_table(connection, args.table,
+                              columns=args.columns.split(',') if args.columns else None,
+                              where=args.where,
+                              group_by=args.group_by.split(',') if args.group_by else None,
+                              aggregates=parse_aggregates(args.aggregates),
+                              histogram=args.histogram, bins=args.bins, top=args.top, limit=args.limit,
+                              use_cache=not args.no_cache, max_age=args.max_age, as_json=args.json)
+        except Exception as e:
+            print(f"Error analyzing data: {e}")
+        close_all_pools()
+        return
+
+    run_upload_session(pool, args)
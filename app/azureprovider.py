@@ -0,0 +1,25 @@
+# Import necessary libraries
+import getpass
+from connectdatabase import get_connection_pool
+from dialects import get_dialect
+from uploadcommand import add_upload_arguments, check_upload_arguments, run_upload_session
+
+# Function to add the Azure SQL options to the 'azure' subcommand
+def add_arguments(azure_db_parser):
+    azure_db_parser.add_argument("--server-name", help="Azure SQL server name")
+    azure_db_parser.add_argument("--database-name", help="Name of the database")
+    azure_db_parser.add_argument("--username", help="Database username")
+    # Checkpoints and upserts use MySQL-only statements
+    add_upload_arguments(azure_db_parser, get_dialect('sqlserver').load_strategies, checkpoints=False)
+
+def run(args, parser):
+    # Azure SQL database connection
+    server_name = args.server_name or input("Enter the Azure SQL server name: ")
+    database_name = args.database_name or input("Enter the name of the database: ")
+    username = args.username or input("Enter the database username: ")
+    password = getpass.getpass("Enter the database password: ")
+
+    check_upload_arguments(args, parser)
+
+    pool = get_connection_pool('azure', server_name, database_name, username, password, pool_size=args.pool_size)
+    run_upload_session(pool, args)
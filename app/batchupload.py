@@ -0,0 +1,203 @@
+# Import necessary libraries
+import csv
+import glob
+import json
+import os
+import re
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass
+from openpyxl import load_workbook
+from bulkload import create_bulk_loader
+from schemacache import SCHEMA_CACHE, check_columns_against_table
+from uploaddata import build_create_table_sql, format_column_name, prepare_records, read_excel_sheet, read_sheet_header
+
+DEFAULT_TABLE_TEMPLATE = "{sheet}"
+
+# One sheet of one workbook going to one table
+@dataclass
+class UploadJob:
+    file: str
+    sheet: str
+    table: str
+
+# Outcome of a single upload job
+@dataclass
+class JobResult:
+    job: UploadJob
+    rows: int = 0
+    parse_seconds: float = 0.0
+    insert_seconds: float = 0.0
+    error: str = None
+
+    @property
+    def succeeded(self):
+        return self.error is None
+
+# Function to turn a file and sheet name into a valid table name
+def format_table_name(template, file_path, sheet_name):
+    stem = os.path.splitext(os.path.basename(file_path))[0]
+    table_name = template.format(file=stem, sheet=sheet_name)
+    return re.sub(r'\W+', '_', table_name).strip('_').lower()
+
+# Function to read upload jobs from a CSV or JSON manifest with file, sheet and table entries
+def load_manifest(manifest_path, table_template=DEFAULT_TABLE_TEMPLATE):
+    if manifest_path.endswith('.json'):
+        with open(manifest_path) as handle:
+            entries = json.load(handle)
+    else:
+        with open(manifest_path, newline='') as handle:
+            entries = list(csv.DictReader(handle))
+
+    base_dir = os.path.dirname(os.path.abspath(manifest_path))
+    jobs = []
+    for entry in entries:
+        # Relative paths in a manifest are resolved against the manifest's own directory
+        file_path = os.path.join(base_dir, entry['file'])
+        sheet_name = entry.get('sheet') or None
+        table_name = entry.get('table') or None
+
+        if sheet_name is None:
+            jobs.extend(jobs_for_workbook(file_path, table_template))
+        else:
+            jobs.append(UploadJob(file_path, sheet_name, table_name or format_table_name(table_template, file_path, sheet_name)))
+
+    return jobs
+
+# Function to create one job per sheet of a workbook
+def jobs_for_workbook(file_path, table_template=DEFAULT_TABLE_TEMPLATE):
+    workbook = load_workbook(file_path, read_only=True)
+    try:
+        sheet_names = workbook.sheetnames
+    finally:
+        workbook.close()
+
+    return [UploadJob(file_path, sheet_name, format_table_name(table_template, file_path, sheet_name)) for sheet_name in sheet_names]
+
+# Function to create jobs for every sheet of every workbook matching a glob pattern
+def jobs_from_glob(pattern, table_template=DEFAULT_TABLE_TEMPLATE):
+    jobs = []
+    for file_path in sorted(glob.glob(pattern, recursive=True)):
+        jobs.extend(jobs_for_workbook(file_path, table_template))
+    return jobs
+
+# Function to check a job's sheet headers against its existing table before the sheet is parsed
+def check_job_columns(pool, job):
+    """Returns {header: table column}; raises ValueError if the sheet does not fit the table."""
+    with pool.connection() as connection:
+        return check_columns_against_table(connection, job.table, read_sheet_header(job.file, job.sheet))
+
+# Function run in a worker process to parse and convert one sheet
+def parse_job(job, use_cache=True, column_mapping=None):
+    """Columns are named through column_mapping for an existing table, or as the CREATE TABLE statement names them."""
+    start = time.perf_counter()
+    df = read_excel_sheet(job.file, job.sheet, use_cache)
+
+    # Remove rows where all elements are NaN (blank lines)
+    df = df.dropna(how='all')
+
+    create_table_sql = build_create_table_sql(job.table, df)
+    if column_mapping is None:
+        columns = [format_column_name(col) for col in df.columns]
+    else:
+        columns = [column_mapping.get(col, col) for col in df.columns]
+    records = prepare_records(df)
+    return columns, create_table_sql, records, time.perf_counter() - start
+
+# Function to insert parsed rows for one job through a connection borrowed from the pool
+def insert_job(pool, result, columns, create_table_sql, records, create_tables, load_options):
+    loader = None
+    start = time.perf_counter()
+    try:
+        with pool.connection() as connection:
+            try:
+                if create_tables:
+                    cursor = connection.cursor()
+                    try:
+                        cursor.execute(create_table_sql)
+                    finally:
+                        cursor.close()
+                    SCHEMA_CACHE.invalidate(connection)
+
+                if records:
+                    loader = create_bulk_loader(connection, result.job.table, columns, **load_options)
+                    result.rows = loader.load(records)
+                    loader.finish()
+                else:
+                    connection.commit()
+
+            except Exception:
+                if loader:
+                    loader.close()
+                raise
+
+    except Exception as e:
+        result.error = str(e)
+
+    finally:
+        result.insert_seconds = time.perf_counter() - start
+
+    return result
+
+# Function to upload many (file, sheet, table) jobs in parallel
+def run_batch_upload(jobs, pool, parse_workers=None, db_connections=4, create_tables=False, load_options=None,
+                     use_cache=True):
+    """Parses sheets in a process pool and inserts them through at most db_connections pooled connections.
+
+    Returns a JobResult for every job, in the order the jobs were given.
+    """
+    load_options = load_options or {}
+    parse_workers = parse_workers or os.cpu_count() or 1
+    insert_workers = max(1, min(db_connections, pool.pool_size))
+    results = [JobResult(job) for job in jobs]
+
+    # Limit how many parsed sheets can wait in memory for a free connection
+    in_flight = threading.BoundedSemaphore(parse_workers + insert_workers)
+
+    with ProcessPoolExecutor(max_workers=parse_workers) as parse_pool, \
+            ThreadPoolExecutor(max_workers=insert_workers) as insert_pool:
+
+        def on_parsed(future, result):
+            try:
+                columns, create_table_sql, records, result.parse_seconds = future.result()
+            except Exception as e:
+                result.error = f"Parse failed: {e}"
+                in_flight.release()
+                return
+
+            insert_future = insert_pool.submit(insert_job, pool, result, columns, create_table_sql,
+                                               records, create_tables, load_options)
+            insert_future.add_done_callback(lambda _: in_flight.release())
+
+        for result in results:
+            column_mapping = None
+            if not create_tables:
+                # A sheet that does not fit its table fails here, before it is parsed
+                try:
+                    column_mapping = check_job_columns(pool, result.job)
+                except Exception as e:
+                    result.error = f"Column check failed: {e}"
+                    continue
+
+            in_flight.acquire()
+            parse_future = parse_pool.submit(parse_job, result.job, use_cache, column_mapping)
+            parse_future.add_done_callback(lambda future, result=result: on_parsed(future, result))
+
+        # Wait until every parsed sheet has been inserted before the pools shut down
+        for _ in range(parse_workers + insert_workers):
+            in_flight.acquire()
+
+    return results
+
+# Function to print a per-job success/failure summary
+def print_batch_summary(results):
+    succeeded = [result for result in results if result.succeeded]
+    print(f"\nBatch upload finished: {len(succeeded)} succeeded, {len(results) - len(succeeded)} failed")
+    for result in results:
+        status = "OK" if result.succeeded else "FAILED"
+        line = (f"  [{status}] {os.path.basename(result.job.file)} / {result.job.sheet} -> {result.job.table}: "
+                f"{result.rows} rows, parse {result.parse_seconds:.2f}s, insert {result.insert_seconds:.2f}s")
+        if result.error:
+            line += f" ({result.error})"
+        print(line)
@@ -0,0 +1,436 @@
+# Import necessary libraries
+import argparse
+import json
+import os
+import platform
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from decimal import Decimal
+from multiprocessing import get_context
+import numpy as np
+import pandas as pd
+from dialects import MySQLDialect
+
+try:
+    import resource
+    HAVE_RESOURCE = True
+except ImportError:
+    HAVE_RESOURCE = False
+
+DEFAULT_ROWS = 100000
+DEFAULT_COLUMNS = 12
+BENCHMARK_SHEET = 'Sheet1'
+BENCHMARK_TABLE = 'benchmark_rows'
+
+# Column kinds the generator cycles through; 'wide' is long free text
+COLUMN_KINDS = ['int', 'float', 'text', 'date', 'bool', 'datetime', 'wide']
+
+# Function to build a DataFrame of synthetic rows with a mix of column types
+def generate_dataframe(rows, columns=DEFAULT_COLUMNS, kinds=None, null_fraction=0.05, seed=0):
+    """Columns cycle through kinds; roughly null_fraction of the values in every column are blank."""
+    rng = np.random.default_rng(seed)
+    kinds = kinds or COLUMN_KINDS
+    data = {}
+    for index in range(columns):
+        kind = kinds[index % len(kinds)]
+        name = f"{kind}_{index}"
+        if kind == 'int':
+            values = pd.Series(rng.integers(-1000000, 1000000, rows), dtype='float64')
+        elif kind == 'float':
+            values = pd.Series(np.round(rng.normal(0, 10000, rows), 4))
+        elif kind == 'text':
+            values = pd.Series(rng.integers(0, 10**8, rows)).map(lambda n: f"item-{n:08d}")
+        elif kind == 'date':
+            values = pd.Series(pd.Timestamp('2000-01-01') + pd.to_timedelta(rng.integers(0, 9000, rows), unit='D'))
+        elif kind == 'datetime':
+            values = pd.Series(pd.Timestamp('2000-01-01') + pd.to_timedelta(rng.integers(0, 10**9, rows), unit='s'))
+        elif kind == 'bool':
+            values = pd.Series(rng.integers(0, 2, rows).astype(bool), dtype=object)
+        elif kind == 'wide':
+            letters = np.array(list('abcdefghijklmnopqrstuvwxyz '))
+            values = pd.Series([''.join(letters[rng.integers(0, 27, 200)]) for _ in range(rows)])
+        else:
+            raise ValueError(f"Unknown column kind '{kind}'. Choose from: {', '.join(COLUMN_KINDS)}")
+
+        if null_fraction:
+            values = values.where(rng.random(rows) >= null_fraction)
+        data[name] = values
+    return pd.DataFrame(data)
+
+# Function to write synthetic rows to any format the converter can write
+def write_synthetic_file(output_file, rows, columns=DEFAULT_COLUMNS, kinds=None, null_fraction=0.05, seed=0,
+                         chunk_rows=50000):
+    from convert import open_writer
+
+    writer = open_writer(output_file)
+    try:
+        # Rows are generated and written a chunk at a time so large files do not need the memory
+        for chunk_index, start in enumerate(range(0, rows, chunk_rows)):
+            df = generate_dataframe(min(chunk_rows, rows - start), columns, kinds, null_fraction, seed + chunk_index)
+            writer.write(df)
+    finally:
+        writer.close()
+    return output_file
+
+# Cursor that accepts the MySQL driver's %s placeholders on a SQLite connection
+class SqliteCursor:
+    def __init__(self, cursor):
+        self.cursor = cursor
+
+    @staticmethod
+    def translate(query):
+        return query.replace('%s', '?')
+
+    def execute(self, query, params=None):
+        self.cursor.execute(self.translate(query), params or ())
+
+    def executemany(self, query, rows):
+        self.cursor.executemany(self.translate(query), rows)
+
+    def fetchone(self):
+        return self.cursor.fetchone()
+
+    def fetchmany(self, size):
+        return self.cursor.fetchmany(size)
+
+    def fetchall(self):
+        return self.cursor.fetchall()
+
+    @property
+    def description(self):
+        return self.cursor.description
+
+    def close(self):
+        self.cursor.close()
+
+# MySQL statements with SQLite's catalog in place of information_schema
+class SqliteDialect(MySQLDialect):
+    name = 'sqlite'
+
+    def schema_metadata_sql(self):
+        return (
+            "SELECT m.name, p.name, p.type, CASE WHEN p.\"notnull\" THEN 'NO' ELSE 'YES' END, p.dflt_value, p.pk, NULL "
+            "FROM sqlite_master m JOIN pragma_table_info(m.name) p "
+            "WHERE m.type = 'table' ORDER BY m.name, p.cid;"
+        )
+
+SQLITE = SqliteDialect()
+
+# Local stand-in for a MySQL connection, so uploads can be measured without a server
+class SqliteConnection:
+    """Wraps a SQLite database file in the parts of the MySQL connection interface the uploads use.
+
+    SQLite accepts MySQL column type names and backtick quoting, so the generated CREATE TABLE and
+    INSERT statements run unchanged. LOAD DATA and ON DUPLICATE KEY UPDATE are not available.
+    """
+
+    dialect = SQLITE
+
+    def __init__(self, path):
+        self.path = path
+        # Keys the schema metadata cache, like a MySQL connection's database name
+        self.database = os.path.abspath(path)
+        self.db = sqlite3.connect(path, check_same_thread=False, timeout=60)
+
+    def cursor(self, **kwargs):
+        return SqliteCursor(self.db.cursor())
+
+    def commit(self):
+        self.db.commit()
+
+    def rollback(self):
+        self.db.rollback()
+
+    def close(self):
+        self.db.close()
+
+# SQLite cannot bind Decimal values, which the upload produces for float columns
+sqlite3.register_adapter(Decimal, str)
+
+# Function to open the database a benchmark stage writes to
+def open_benchmark_connection(database):
+    if database.get('endpoint'):
+        from connectdatabase import connect_to_aws_rds
+        connection = connect_to_aws_rds(database['name'], database['username'], database['password'],
+                                        database['endpoint'], database['port'], allow_local_infile=True)
+        if connection is None:
+            raise ConnectionError(f"Could not connect to {database['endpoint']}")
+        return connection
+    return SqliteConnection(database['path'])
+
+# Function to drop and recreate the benchmark table from the first rows of the sheet
+def reset_benchmark_table(connection, excel_file_path, table_name):
+    from uploaddata import build_create_table_sql, iter_excel_chunks
+    from schemacache import SCHEMA_CACHE
+
+    sample = next(iter_excel_chunks(excel_file_path, BENCHMARK_SHEET, 1000))
+    cursor = connection.cursor()
+    try:
+        cursor.execute(f"DROP TABLE IF EXISTS {table_name};")
+        cursor.execute(build_create_table_sql(table_name, sample.dropna(how='all'), sampled=True))
+        connection.commit()
+    finally:
+        cursor.close()
+    SCHEMA_CACHE.invalidate(connection)
+
+# Function to count the rows that actually reached the table
+def count_table_rows(connection, table_name):
+    cursor = connection.cursor()
+    try:
+        cursor.execute(f"SELECT COUNT(*) FROM {table_name};")
+        return int(cursor.fetchone()[0])
+    finally:
+        cursor.close()
+
+# Each stage is a function of (files, database, options) returning the rows it handled
+def stage_convert_csv_to_xlsx(files, database, options):
+    from convert import convert_file
+    # convert_file raises on failure, so a broken conversion is never timed as a success
+    return convert_file(files['csv'], files['converted_xlsx'], use_cache=False)
+
+def stage_convert_xlsx_to_parquet(files, database, options):
+    from convert import convert_file
+    return convert_file(files['xlsx'], files['converted_parquet'], use_cache=False)
+
+def stage_parse_xlsx(files, database, options):
+    from uploaddata import read_excel_sheet
+    return len(read_excel_sheet(files['xlsx'], BENCHMARK_SHEET, use_cache=False))
+
+def stage_parse_xlsx_cached(files, database, options):
+    from uploaddata import read_excel_sheet
+    # The first read fills the cache and is not timed; see run_stage
+    return len(read_excel_sheet(files['xlsx'], BENCHMARK_SHEET, use_cache=True))
+
+def stage_create_table(files, database, options):
+    from uploaddata import auto_create_table_from_excel
+    connection = open_benchmark_connection(database)
+    try:
+        cursor = connection.cursor()
+        cursor.execute(f"DROP TABLE IF EXISTS {BENCHMARK_TABLE};")
+        cursor.close()
+        parsed = auto_create_table_from_excel(connection, BENCHMARK_TABLE, files['xlsx'], BENCHMARK_SHEET,
+                                              chunk_rows=options['chunk_rows'], use_cache=False)
+        if parsed is None:
+            raise RuntimeError("Table creation failed")
+        return sum(len(df) for df in parsed)
+    finally:
+        connection.close()
+
+def stage_upload(files, database, options):
+    from uploaddata import upload_excel_data
+    connection = open_benchmark_connection(database)
+    try:
+        upload_excel_data(connection, BENCHMARK_TABLE, files['xlsx'], BENCHMARK_SHEET, chunk_rows=options['chunk_rows'],
+                          load_strategy=options['strategy'], batch_size=options['batch_size'], use_cache=False)
+        return count_table_rows(connection, BENCHMARK_TABLE)
+    finally:
+        connection.close()
+
+def stage_pipeline_upload(files, database, options):
+    from connectdatabase import ConnectionPool
+    from pipeline import pipeline_upload_excel_data
+
+    pool = ConnectionPool(lambda: open_benchmark_connection(database), pool_size=options['insert_workers'],
+                          health_check=lambda connection: True)
+    try:
+        pipeline_upload_excel_data(pool, BENCHMARK_TABLE, files['xlsx'], BENCHMARK_SHEET,
+                                   chunk_rows=options['chunk_rows'], insert_workers=options['insert_workers'],
+                                   load_strategy=options['strategy'], batch_size=options['batch_size'],
+                                   use_cache=False)
+        with pool.connection() as connection:
+            return count_table_rows(connection, BENCHMARK_TABLE)
+    finally:
+        pool.close_all()
+
+STAGES = {
+    'convert-csv-to-xlsx': stage_convert_csv_to_xlsx,
+    'convert-xlsx-to-parquet': stage_convert_xlsx_to_parquet,
+    'parse-xlsx': stage_parse_xlsx,
+    'parse-xlsx-cached': stage_parse_xlsx_cached,
+    'create-table': stage_create_table,
+    'upload': stage_upload,
+    'pipeline-upload': stage_pipeline_upload,
+}
+
+# Function to measure this process's peak resident memory in bytes
+def peak_rss_bytes():
+    if not HAVE_RESOURCE:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+# Function run in a fresh worker process so each stage's peak memory is its own
+def run_stage(stage, files, database, options):
+    if stage in ('upload', 'pipeline-upload'):
+        connection = open_benchmark_connection(database)
+        try:
+            reset_benchmark_table(connection, files['xlsx'], BENCHMARK_TABLE)
+        finally:
+            connection.close()
+    if stage == 'parse-xlsx-cached':
+        STAGES[stage](files, database, options)
+
+    start = time.perf_counter()
+    rows = STAGES[stage](files, database, options)
+    seconds = time.perf_counter() - start
+
+    return {
+        'stage': stage,
+        'rows': rows,
+        'seconds': round(seconds, 4),
+        'rows_per_second': round(rows / seconds, 1) if seconds else None,
+        'peak_rss_bytes': peak_rss_bytes(),
+    }
+
+# Function to run the selected stages and collect their measurements
+def run_benchmarks(stages, rows=DEFAULT_ROWS, columns=DEFAULT_COLUMNS, null_fraction=0.05, seed=0, chunk_rows=20000,
+                   strategies=('executemany', 'multirow'), batch_size=None, insert_workers=1, database=None,
+                   work_dir=None):
+    """Generates the input files once, then runs every stage in its own process and returns a results dict."""
+    own_work_dir = work_dir is None
+    work_dir = work_dir or tempfile.mkdtemp(prefix='centerspoke_benchmark_')
+    os.makedirs(work_dir, exist_ok=True)
+    # Keep the cached-parse stage from touching the user's real cache
+    os.environ['CENTERSPOKE_CACHE_DIR'] = os.path.join(work_dir, 'cache')
+
+    database = dict(database or {})
+    database.setdefault('path', os.path.join(work_dir, 'benchmark.db'))
+
+    files = {
+        'csv': os.path.join(work_dir, 'input.csv'),
+        'xlsx': os.path.join(work_dir, 'input.xlsx'),
+        'converted_xlsx': os.path.join(work_dir, 'converted.xlsx'),
+        'converted_parquet': os.path.join(work_dir, 'converted.parquet'),
+    }
+
+    results = []
+    try:
+        for key in ('csv', 'xlsx'):
+            start = time.perf_counter()
+            write_synthetic_file(files[key], rows, columns, null_fraction=null_fraction, seed=seed)
+            seconds = time.perf_counter() - start
+            results.append({'stage': f'generate-{key}', 'rows': rows, 'seconds': round(seconds, 4),
+                            'rows_per_second': round(rows / seconds, 1) if seconds else None,
+                            'file_bytes': os.path.getsize(files[key])})
+            print(f"Generated {files[key]} ({rows} rows, {os.path.getsize(files[key])} bytes) in {seconds:.2f}s")
+
+        runs = []
+        for stage in stages:
+            if stage in ('upload', 'pipeline-upload'):
+                runs.extend([(stage, strategy) for strategy in strategies])
+            else:
+                runs.append((stage, None))
+
+        # spawn gives every stage a clean process, so memory from one stage does not count towards the next
+        context = get_context('spawn')
+        for stage, strategy in runs:
+            options = {'rows': rows, 'chunk_rows': chunk_rows, 'strategy': strategy, 'batch_size': batch_size,
+                       'insert_workers': insert_workers}
+            label = f"{stage}[{strategy}]" if strategy else stage
+            try:
+                with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+                    result = executor.submit(run_stage, stage, files, database, options).result()
+                result['stage'] = label
+                if strategy:
+                    result['strategy'] = strategy
+                if result['rows'] != rows:
+                    result['error'] = f"expected {rows} rows, got {result['rows']}"
+            except Exception as e:
+                result = {'stage': label, 'error': str(e)}
+            results.append(result)
+            print_result(result)
+
+    finally:
+        if own_work_dir:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    return {
+        'started_at': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'pandas': pd.__version__,
+        'parameters': {
+            'rows': rows, 'columns': columns, 'null_fraction': null_fraction, 'seed': seed,
+            'chunk_rows': chunk_rows, 'batch_size': batch_size, 'insert_workers': insert_workers,
+            'database': 'mysql' if database.get('endpoint') else 'sqlite',
+        },
+        'results': results,
+    }
+
+def print_result(result):
+    if result.get('error') and 'seconds' not in result:
+        print(f"  {result['stage']:<32} FAILED: {result['error']}")
+        return
+    rss = result.get('peak_rss_bytes')
+    rss_text = f"{rss / 2**20:8.1f} MiB" if rss else "       n/a"
+    line = f"  {result['stage']:<32} {result['seconds']:9.2f}s {result['rows_per_second'] or 0:12.0f} rows/s {rss_text}"
+    if result.get('error'):
+        line += f"  ({result['error']})"
+    print(line)
+
+# Function to print how each stage changed relative to an earlier results file
+def compare_results(current, previous_file):
+    with open(previous_file, encoding='utf-8') as handle:
+        previous = {result['stage']: result for result in json.load(handle)['results']}
+
+    print(f"\nCompared with {previous_file}:")
+    for result in current['results']:
+        before = previous.get(result['stage'])
+        if not before or not before.get('seconds') or not result.get('seconds'):
+            continue
+        change = (result['seconds'] - before['seconds']) / before['seconds'] * 100
+        print(f"  {result['stage']:<32} {before['seconds']:9.2f}s -> {result['seconds']:9.2f}s ({change:+.1f}%)")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark Centerspoke conversions and uploads on synthetic data")
+    parser.add_argument("--rows", type=int, default=DEFAULT_ROWS, help="Rows in the generated files")
+    parser.add_argument("--columns", type=int, default=DEFAULT_COLUMNS, help=f"Columns in the generated files, cycling through {', '.join(COLUMN_KINDS)}")
+    parser.add_argument("--null-fraction", type=float, default=0.05, help="Share of blank values in every column")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed, so runs are reproducible")
+    parser.add_argument("--stages", default=','.join(STAGES), help="Comma-separated stages to run")
+    parser.add_argument("--strategies", default="executemany,multirow", help="Load strategies to run the upload stages with")
+    parser.add_argument("--chunk-rows", type=int, default=20000, help="Rows per chunk for streamed stages")
+    parser.add_argument("--batch-size", type=int, help="Rows sent per insert statement")
+    parser.add_argument("--insert-workers", type=int, default=1, help="Insert connections for the pipeline stage (keep at 1 for SQLite)")
+    parser.add_argument("--work-dir", help="Keep generated files here instead of a temporary directory")
+    parser.add_argument("--output", help="JSON results file (default: benchmark-<timestamp>.json)")
+    parser.add_argument("--compare", help="Earlier JSON results file to compare this run against")
+    parser.add_argument("--database-endpoint", help="Benchmark against this MySQL server instead of a local SQLite file")
+    parser.add_argument("--database-name", help="MySQL database name")
+    parser.add_argument("--port", default="3306", help="MySQL port")
+    parser.add_argument("--username", help="MySQL username")
+    parser.add_argument("--password", help="MySQL password")
+    args = parser.parse_args()
+
+    stages = [stage.strip() for stage in args.stages.split(',') if stage.strip()]
+    unknown = [stage for stage in stages if stage not in STAGES]
+    if unknown:
+        parser.error(f"Unknown stages: {', '.join(unknown)}. Choose from: {', '.join(STAGES)}")
+
+    database = None
+    if args.database_endpoint:
+        database = {'endpoint': args.database_endpoint, 'name': args.database_name, 'port': args.port,
+                    'username': args.username, 'password': args.password}
+
+    report = run_benchmarks(stages, rows=args.rows, columns=args.columns, null_fraction=args.null_fraction,
+                            seed=args.seed, chunk_rows=args.chunk_rows,
+                            strategies=[strategy.strip() for strategy in args.strategies.split(',')],
+                            batch_size=args.batch_size, insert_workers=args.insert_workers, database=database,
+                            work_dir=args.work_dir)
+
+    output_file = args.output or f"benchmark-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json"
+    with open(output_file, 'w', encoding='utf-8') as handle:
+        json.dump(report, handle, indent=2)
+    print(f"Results written to {output_file}")
+
+    if args.compare:
+        compare_results(report, args.compare)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,279 @@
+# Import necessary libraries
+import base64
+import json
+import os
+import tempfile
+from dialects import MYSQL, dialect_for_connection
+from metrics import span, increment
+
+DEFAULT_BATCH_SIZE = 1000
+
+# Python types drivers return for binary (BLOB, VARBINARY) columns
+BINARY_TYPES = (bytes, bytearray, memoryview)
+
+# Base class for strategies that write row tuples into a table
+class BulkLoader:
+    """Writes batches of row tuples into a table and commits every commit_every rows.
+
+    With upsert, rows whose unique key already exists replace the stored values instead of failing.
+    The dialect decides how identifiers are quoted and which placeholders the driver expects.
+    """
+
+    name = None
+
+    def __init__(self, connection, table_name, columns, batch_size=DEFAULT_BATCH_SIZE, commit_every=None, upsert=False,
+                 dialect=MYSQL):
+        self.connection = connection
+        self.table_name = table_name
+        self.columns = list(columns)
+        self.batch_size = batch_size or DEFAULT_BATCH_SIZE
+        self.commit_every = commit_every
+        self.upsert = upsert
+        self.dialect = dialect
+        self.rows_loaded = 0
+        self.rows_since_commit = 0
+        self.cursor = connection.cursor()
+
+    def column_list(self):
+        return self.dialect.column_list(self.columns)
+
+    def upsert_clause(self):
+        if not self.upsert:
+            return ''
+        return self.dialect.upsert_clause(self.columns)
+
+    def load(self, records):
+        """Loads a sequence of row tuples, splitting it into batches of batch_size rows."""
+        for start in range(0, len(records), self.batch_size):
+            batch = records[start:start + self.batch_size]
+            with span(f'db.write_batch.{self.name}'):
+                self.write_batch(batch)
+            increment('db.batches')
+            increment('db.rows', len(batch))
+            self.rows_loaded += len(batch)
+            self.rows_since_commit += len(batch)
+
+            if self.commit_every and self.rows_since_commit >= self.commit_every:
+                self.commit()
+
+        return len(records)
+
+    def write_batch(self, batch):
+        raise NotImplementedError
+
+    def commit(self):
+        with span('db.commit'):
+            self.connection.commit()
+        self.rows_since_commit = 0
+
+    def finish(self):
+        """Commits any outstanding rows and releases the cursor."""
+        try:
+            self.commit()
+        finally:
+            self.close()
+
+    def close(self):
+        if self.cursor:
+            self.cursor.close()
+            self.cursor = None
+
+# Strategy that hands each batch to cursor.executemany
+class ExecuteManyLoader(BulkLoader):
+    name = 'executemany'
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        placeholders = ', '.join([self.dialect.placeholder] * len(self.columns))
+        self.insert_query = f"INSERT INTO {self.table_name} ({self.column_list()}) VALUES ({placeholders}){self.upsert_clause()};"
+
+    def write_batch(self, batch):
+        self.cursor.executemany(self.insert_query, batch)
+
+# Strategy for SQL Server that has pyodbc send each batch as one array of parameters
+class FastExecuteManyLoader(ExecuteManyLoader):
+    name = 'fast-executemany'
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Without this pyodbc makes a round trip per row
+        self.cursor.fast_executemany = True
+
+# Strategy that sends each batch as a single INSERT ... VALUES (...),(...) statement
+class MultiRowInsertLoader(BulkLoader):
+    name = 'multirow'
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Stay within the engine's limits on rows and parameters per statement
+        if self.dialect.max_insert_rows:
+            self.batch_size = min(self.batch_size, self.dialect.max_insert_rows)
+        if self.dialect.max_parameters:
+            self.batch_size = max(1, min(self.batch_size, (self.dialect.max_parameters - 1) // len(self.columns)))
+        self.row_placeholder = '(' + ', '.join([self.dialect.placeholder] * len(self.columns)) + ')'
+        self.query_prefix = f"INSERT INTO {self.table_name} ({self.column_list()}) VALUES "
+        self.full_batch_query = self.build_query(self.batch_size)
+
+    def build_query(self, row_count):
+        return self.query_prefix + ', '.join([self.row_placeholder] * row_count) + self.upsert_clause() + ';'
+
+    def write_batch(self, batch):
+        # The statement for a full batch is built once; only the trailing short batch needs its own
+        query = self.full_batch_query if len(batch) == self.batch_size else self.build_query(len(batch))
+        params = [value for row in batch for value in row]
+        self.cursor.execute(query, params)
+
+# Strategy that streams each batch to MySQL through a temporary file and LOAD DATA LOCAL INFILE
+class LoadDataInfileLoader(BulkLoader):
+    name = 'load-data'
+
+    # MySQL's default LOAD DATA format is tab-separated with backslash escapes and \N for NULL
+    escapes = str.maketrans({'\\': '\\\\', '\t': '\\t', '\n': '\\n', '\r': '\\r', '\0': '\\0'})
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Larger batches amortise the per-statement cost of LOAD DATA
+        self.batch_size = max(self.batch_size, 50000)
+
+    def format_value(self, value):
+        if value is None:
+            return '\\N'
+        if isinstance(value, bool):
+            return '1' if value else '0'
+        if isinstance(value, BINARY_TYPES):
+            # Raw bytes are not valid text in the file; they travel as hex and are decoded by UNHEX
+            return bytes(value).hex()
+        return str(value).translate(self.escapes)
+
+    def target_list(self, batch):
+        """Returns the column list and SET clause of the LOAD DATA statement for a batch."""
+        binary = [index for index in range(len(self.columns))
+                  if any(isinstance(row[index], BINARY_TYPES) for row in batch)]
+        if not binary:
+            return f"({self.column_list()})", ''
+        targets = [f"@v{index}" if index in binary else self.dialect.quote(column)
+                   for index, column in enumerate(self.columns)]
+        assignments = ', '.join([f"{self.dialect.quote(self.columns[index])} = UNHEX(@v{index})" for index in binary])
+        return f"({', '.join(targets)})", f" SET {assignments}"
+
+    def write_batch(self, batch):
+        fd, path = tempfile.mkstemp(prefix='centerspoke_', suffix='.tsv')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8', newline='') as handle:
+                for row in batch:
+                    handle.write('\t'.join([self.format_value(value) for value in row]))
+                    handle.write('\n')
+
+            # REPLACE makes rows with an existing unique key overwrite the stored ones
+            duplicate_handling = 'REPLACE ' if self.upsert else ''
+            targets, assignments = self.target_list(batch)
+            load_query = (
+                f"LOAD DATA LOCAL INFILE '{path.replace(os.sep, '/')}' {duplicate_handling}INTO TABLE {self.table_name} "
+                f"CHARACTER SET utf8mb4 {targets}{assignments};"
+            )
+            self.cursor.execute(load_query)
+
+        finally:
+            os.remove(path)
+
+# Function to read the declared types of a SQL Server table's columns, keyed by lowercased name
+def get_sqlserver_column_types(cursor, table_name):
+    cursor.execute(
+        "SELECT COLUMN_NAME, DATA_TYPE, CHARACTER_MAXIMUM_LENGTH, NUMERIC_PRECISION, NUMERIC_SCALE "
+        "FROM INFORMATION_SCHEMA.COLUMNS WHERE TABLE_NAME = ?;",
+        (table_name,)
+    )
+    column_types = {}
+    for column_name, data_type, max_length, precision, scale in cursor.fetchall():
+        if max_length is not None:
+            data_type += '(max)' if max_length == -1 else f'({max_length})'
+        elif data_type in ('decimal', 'numeric'):
+            data_type += f'({precision}, {scale})'
+        column_types[column_name.lower()] = data_type
+    return column_types
+
+# Strategy for SQL Server that sends each batch as a single JSON document unpacked by OPENJSON
+class OpenJsonLoader(BulkLoader):
+    """One statement and one parameter per batch, similar to a table-valued parameter but without
+    needing a table type created on the server first."""
+
+    name = 'openjson'
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Larger batches amortise the cost of parsing the document on the server
+        self.batch_size = max(self.batch_size, 10000)
+
+        column_types = get_sqlserver_column_types(self.cursor, self.table_name)
+        missing = [col for col in self.columns if str(col).lower() not in column_types]
+        if missing:
+            raise ValueError(f"Columns not found in '{self.table_name}': {', '.join(map(str, missing))}")
+
+        # Each row travels as a JSON array, so column i is read from position i into c<i>
+        definitions = []
+        select_list = []
+        for index, col in enumerate(self.columns):
+            column_type = column_types[str(col).lower()]
+            if column_type.startswith(('binary', 'varbinary', 'image')):
+                # Binary values arrive as base64 text and are decoded on the server
+                definitions.append(f"c{index} NVARCHAR(MAX) '$[{index}]'")
+                select_list.append(f"CAST(N'' AS XML).value('xs:base64Binary(sql:column(\"j.c{index}\"))', 'VARBINARY(MAX)')")
+            else:
+                definitions.append(f"c{index} {column_type} '$[{index}]'")
+                select_list.append(f"j.c{index}")
+        self.insert_query = (f"INSERT INTO {self.table_name} ({self.column_list()}) "
+                             f"SELECT {', '.join(select_list)} FROM OPENJSON(?) WITH ({', '.join(definitions)}) AS j;")
+
+    def write_batch(self, batch):
+        self.cursor.execute(self.insert_query, (json.dumps(batch, default=json_value),))
+
+# Function to encode a value JSON has no type for
+def json_value(value):
+    if isinstance(value, BINARY_TYPES):
+        return base64.b64encode(bytes(value)).decode('ascii')
+    # Decimals, dates and the like are sent as their text form, which SQL Server converts back
+    return str(value)
+
+LOAD_STRATEGIES = {
+    loader.name: loader for loader in (ExecuteManyLoader, MultiRowInsertLoader, LoadDataInfileLoader,
+                                       FastExecuteManyLoader, OpenJsonLoader)
+}
+
+# Function to check whether both the client and the server allow LOAD DATA LOCAL INFILE
+def local_infile_available(connection):
+    # mysql.connector only sends local files when the connection was opened with allow_local_infile
+    if not getattr(connection, '_allow_local_infile', False):
+        return False
+
+    cursor = connection.cursor()
+    try:
+        cursor.execute("SELECT @@local_infile;")
+        row = cursor.fetchone()
+        return bool(row and int(row[0]))
+
+    except Exception:
+        return False
+
+    finally:
+        cursor.close()
+
+# Function to pick a load strategy when the user asked for 'auto'
+def select_load_strategy(connection, strategy='auto', dialect=MYSQL):
+    if strategy and strategy != 'auto':
+        if strategy not in dialect.load_strategies:
+            raise ValueError(f"Unknown load strategy '{strategy}' for {dialect.name}. "
+                             f"Choose from: auto, {', '.join(dialect.load_strategies)}")
+        return strategy
+
+    if 'load-data' in dialect.load_strategies and local_infile_available(connection):
+        return 'load-data'
+    return dialect.default_load_strategy
+
+# Function to create a bulk loader for a table
+def create_bulk_loader(connection, table_name, columns, strategy='auto', batch_size=DEFAULT_BATCH_SIZE, commit_every=None,
+                       upsert=False, dialect=None):
+    # The dialect follows from the driver unless the caller names one
+    dialect = dialect or dialect_for_connection(connection)
+    strategy = select_load_strategy(connection, strategy, dialect)
+    return LOAD_STRATEGIES[strategy](connection, table_name, columns, batch_size=batch_size, commit_every=commit_every,
+                                     upsert=upsert, dialect=dialect)
@@ -0,0 +1,154 @@
+# Import necessary libraries
+import os
+import sqlite3
+from schemacache import describe_database
+
+# Table in the target database that records how far each upload has got
+CHECKPOINT_TABLE = "centerspoke_checkpoints"
+
+DEFAULT_STATE_PATH = os.path.join(os.path.expanduser("~"), ".cache", "centerspoke", "state.db")
+
+# Function to create the checkpoint table if it does not exist yet
+def ensure_checkpoint_table(connection):
+    cursor = connection.cursor()
+    try:
+        cursor.execute(
+            f"CREATE TABLE IF NOT EXISTS {CHECKPOINT_TABLE} ("
+            "file_hash CHAR(40) NOT NULL, "
+            "sheet_name VARCHAR(255) NOT NULL, "
+            "table_name VARCHAR(255) NOT NULL, "
+            "rows_committed BIGINT NOT NULL, "
+            "completed BOOLEAN NOT NULL DEFAULT 0, "
+            "updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP, "
+            "PRIMARY KEY (file_hash, sheet_name, table_name));"
+        )
+        connection.commit()
+    finally:
+        cursor.close()
+
+# Function to read how many rows of a file's sheet are already committed to a table
+def read_checkpoint(connection, file_hash, sheet_name, table_name):
+    """Returns (rows_committed, completed), or (0, False) if this upload has never run."""
+    cursor = connection.cursor()
+    try:
+        cursor.execute(
+            f"SELECT rows_committed, completed FROM {CHECKPOINT_TABLE} "
+            "WHERE file_hash = %s AND sheet_name = %s AND table_name = %s;",
+            (file_hash, str(sheet_name), table_name)
+        )
+        row = cursor.fetchone()
+        return (int(row[0]), bool(row[1])) if row else (0, False)
+    finally:
+        cursor.close()
+
+# Function to record progress; call it on the loader's cursor so it commits together with the rows
+def write_checkpoint(cursor, file_hash, sheet_name, table_name, rows_committed, completed=False):
+    cursor.execute(
+        f"INSERT INTO {CHECKPOINT_TABLE} (file_hash, sheet_name, table_name, rows_committed, completed) "
+        "VALUES (%s, %s, %s, %s, %s) "
+        "ON DUPLICATE KEY UPDATE rows_committed = VALUES(rows_committed), completed = VALUES(completed);",
+        (file_hash, str(sheet_name), table_name, rows_committed, int(completed))
+    )
+
+# Function to forget an upload's progress so the next run starts from the first row
+def clear_checkpoint(connection, file_hash, sheet_name, table_name):
+    cursor = connection.cursor()
+    try:
+        cursor.execute(
+            f"DELETE FROM {CHECKPOINT_TABLE} WHERE file_hash = %s AND sheet_name = %s AND table_name = %s;",
+            (file_hash, str(sheet_name), table_name)
+        )
+        connection.commit()
+    finally:
+        cursor.close()
+
+# Function to name the database table an upload writes to, for keying local state
+def describe_target(connection, table_name):
+    return f"{describe_database(connection)}/{table_name}"
+
+# Function to put columns into one representation per kind of value before hashing
+def normalize_for_hash(df):
+    # Imported here so the commands that only need the state database path do not load pandas
+    import pandas as pd
+
+    # The same value can arrive as int64 in one chunk and float64 in the next (when that chunk
+    # has blanks), so numbers are hashed as floats and everything else as text
+    normalized = {}
+    for col in df.columns:
+        series = df[col]
+        if series.dtype.kind in 'biuf':
+            normalized[col] = series.astype('float64')
+        elif series.dtype.kind == 'M':
+            normalized[col] = series
+        else:
+            normalized[col] = series.astype(str).where(series.notna(), '')
+    return pd.DataFrame(normalized, index=df.index)
+
+# Function to hash each row of a DataFrame, optionally over just some columns
+def hash_rows(df, columns=None):
+    import numpy as np
+    import pandas as pd
+
+    frame = df if columns is None else df[list(columns)]
+    # hash_pandas_object hashes whole columns at once and combines them per row
+    return pd.util.hash_pandas_object(normalize_for_hash(frame), index=False).to_numpy().astype(np.int64)
+
+# Local record of the rows already sent to each table, for incremental uploads
+class RowHashStore:
+    """Keeps a hash of every row sent to a target table in a local SQLite file.
+
+    With key columns, the stored value is the hash of the whole row under the hash of its key,
+    so a changed row can be told apart from a new one. Without them, rows are matched on their
+    full hash only.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or os.environ.get("CENTERSPOKE_STATE_DB", DEFAULT_STATE_PATH)
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self.db = sqlite3.connect(self.path)
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS row_hashes ("
+            "target TEXT NOT NULL, key_hash INTEGER NOT NULL, row_hash INTEGER NOT NULL, "
+            "PRIMARY KEY (target, key_hash)) WITHOUT ROWID"
+        )
+        self.db.commit()
+
+    def load(self, target):
+        """Returns the stored hashes for a target as a Series of row hashes indexed by key hash."""
+        import numpy as np
+        import pandas as pd
+
+        rows = self.db.execute("SELECT key_hash, row_hash FROM row_hashes WHERE target = ?", (target,)).fetchall()
+        if not rows:
+            return pd.Series([], dtype=np.int64, index=pd.Index([], dtype=np.int64))
+        stored = np.array(rows, dtype=np.int64)
+        return pd.Series(stored[:, 1], index=stored[:, 0])
+
+    def record(self, target, key_hashes, row_hashes):
+        self.db.executemany(
+            "INSERT OR REPLACE INTO row_hashes (target, key_hash, row_hash) VALUES (?, ?, ?)",
+            zip([target] * len(key_hashes), key_hashes.tolist(), row_hashes.tolist())
+        )
+        self.db.commit()
+
+    def clear(self, target):
+        self.db.execute("DELETE FROM row_hashes WHERE target = ?", (target,))
+        self.db.commit()
+
+    def close(self):
+        self.db.close()
+
+# Function to find the rows of a chunk that are new or changed since the last upload
+def changed_rows(df, stored, key_columns=None):
+    """Returns (mask, key_hashes, row_hashes) where mask marks the rows that still need sending."""
+    import numpy as np
+
+    row_hashes = hash_rows(df)
+    # Without a declared key the whole row is its own key
+    key_hashes = hash_rows(df, key_columns) if key_columns else row_hashes
+
+    # Key hashes are unique in the store, so each one maps to at most one stored row hash
+    positions = stored.index.get_indexer(key_hashes)
+    previous = stored.to_numpy()[positions] if len(stored) else np.zeros(len(df), dtype=np.int64)
+    mask = (positions == -1) | (previous != row_hashes)
+    return mask, key_hashes, row_hashes
@@ -1,19 +1,25 @@
 # Import necessary libraries
-import boto3
-import mysql.connector
-import pyodbc
-from google.cloud import storage
+import threading
+import time
+from contextlib import contextmanager
+from dialects import dialect_for_connection
+from metrics import span, add_time, increment
+from schemacache import SCHEMA_CACHE
 
 # Function to connect to AWS RDS
-def connect_to_aws_rds(database_name, username, password, database_endpoint, port):
+def connect_to_aws_rds(database_name, username, password, database_endpoint, port, allow_local_infile=False):
     try:
+        # Drivers are imported on first use so each command only loads the one it needs
+        import mysql.connector
+
         # Establish connection
         conn = mysql.connector.connect(
             user=username,
             password=password,
             host=database_endpoint,
             database=database_name,
-            port=int(port)
+            port=int(port),
+            allow_local_infile=allow_local_infile
         )
 
         print("Connected to the AWS RDS database successfully!")
@@ -26,6 +32,8 @@ def connect_to_aws_rds(database_name, username, password, database_endpoint, por
 # Function to connect to Azure SQL
 def connect_to_azure_sql(server_name, database_name, username, password):
     try:
+        import pyodbc
+
         # Establish connection
         connection_str = f"Driver={{ODBC Driver 17 for SQL Server}};Server={server_name}.database.windows.net;Database={database_name};UID={username};PWD={password};"
         conn = pyodbc.connect(connection_str)
@@ -38,14 +46,17 @@ def connect_to_azure_sql(server_name, database_name, username, password):
         return None
 
 # Function to connect to Google Cloud SQL
-def connect_to_google_cloud_sql(instance_connection_name, database_name, username, password):
+def connect_to_google_cloud_sql(instance_connection_name, database_name, username, password, allow_local_infile=False):
     try:
+        import mysql.connector
+
         # Establish connection
         conn = mysql.connector.connect(
             user=username,
             password=password,
             host=instance_connection_name,
-            database=database_name
+            database=database_name,
+            allow_local_infile=allow_local_infile
         )
 
         print("Connected to Google Cloud SQL Database successfully!")
@@ -58,8 +69,10 @@ def connect_to_google_cloud_sql(instance_connection_name, database_name, usernam
 # Function to connect to Google Cloud Storage
 def connect_to_google_cloud_storage(bucket_name):
     try:
-        # Establish connection
-        storage_client = storage.Client()
+        from gcstransfer import get_storage_client
+
+        # Establish connection (to the emulator at STORAGE_EMULATOR_HOST when it is set)
+        storage_client = get_storage_client()
         bucket = storage_client.get_bucket(bucket_name)
 
         print(f"Connected to Google Cloud Storage bucket '{bucket_name}' successfully!")
@@ -69,40 +82,186 @@ def connect_to_google_cloud_storage(bucket_name):
         print(f"An error occurred: {e}")
         return None
 
-# Function to create a table in MySQL
-def create_table_mysql(connection, table_name, column_definitions):
+# Function to check that an open connection still works
+def connection_is_healthy(connection):
     try:
-        cursor = connection.cursor()
-        create_table_query = f"CREATE TABLE IF NOT EXISTS {table_name} ({column_definitions})"
-        cursor.execute(create_table_query)
-        connection.commit()
-        print(f"Table '{table_name}' created successfully!")
+        if hasattr(connection, 'ping'):
+            # mysql.connector connections (AWS RDS and Google Cloud SQL)
+            connection.ping(reconnect=False)
+        else:
+            # pyodbc connections (Azure SQL) have no ping, so run a trivial query
+            cursor = connection.cursor()
+            try:
+                cursor.execute("SELECT 1")
+                cursor.fetchall()
+            finally:
+                cursor.close()
+        return True
 
-    except Exception as e:
-        print(f"An error occurred: {e}")
+    except Exception:
+        return False
+
+# Pool of reusable connections to one database
+class ConnectionPool:
+    """Hands out open connections and takes them back for reuse.
+
+    Connections are health-checked on checkout, replaced when the session has dropped,
+    and closed once they have sat idle for longer than max_idle_seconds.
+    """
+
+    def __init__(self, connect, pool_size=4, max_idle_seconds=300, health_check=connection_is_healthy):
+        self.connect = connect
+        self.pool_size = pool_size
+        self.max_idle_seconds = max_idle_seconds
+        self.health_check = health_check
+        self.idle = []  # (connection, time it was returned)
+        self.checked_out = 0
+        self.condition = threading.Condition()
+
+    def acquire(self, timeout=None):
+        wait_start = time.perf_counter()
+        with self.condition:
+            self.evict_idle()
+
+            # Wait for a free slot once pool_size connections are in use
+            if not self.condition.wait_for(lambda: self.idle or self.checked_out < self.pool_size, timeout):
+                raise TimeoutError("Timed out waiting for a pooled database connection")
+
+            connection = self.idle.pop()[0] if self.idle else None
+            self.checked_out += 1
+        add_time('db.pool_wait', time.perf_counter() - wait_start)
+
+        try:
+            if connection is not None:
+                with span('db.health_check'):
+                    healthy = self.health_check(connection)
+                if not healthy:
+                    # The session was dropped (timeout, failover, network blip); reconnect
+                    increment('db.reconnects')
+                    close_quietly(connection)
+                    connection = None
+
+            if connection is None:
+                with span('db.connect'):
+                    connection = self.connect()
+                if connection is None:
+                    increment('db.connect_failures')
+                    raise ConnectionError("Could not open a database connection")
+                increment('db.connections_opened')
+
+            return connection
 
-# Function to create a table in Azure SQL
-def create_table_azure_sql(connection, table_name, column_definitions):
+        except Exception:
+            with self.condition:
+                self.checked_out -= 1
+                self.condition.notify()
+            raise
+
+    def release(self, connection):
+        # Discard any transaction the borrower left open so the next user starts clean
+        try:
+            connection.rollback()
+        except Exception:
+            close_quietly(connection)
+            connection = None
+
+        with self.condition:
+            self.checked_out -= 1
+            if connection is not None:
+                self.idle.append((connection, time.monotonic()))
+            self.condition.notify()
+
+    @contextmanager
+    def connection(self):
+        connection = self.acquire()
+        try:
+            yield connection
+        finally:
+            self.release(connection)
+
+    def evict_idle(self):
+        # Called with the condition held
+        cutoff = time.monotonic() - self.max_idle_seconds
+        stale = [connection for connection, returned_at in self.idle if returned_at < cutoff]
+        self.idle = [(connection, returned_at) for connection, returned_at in self.idle if returned_at >= cutoff]
+        for connection in stale:
+            close_quietly(connection)
+
+    def close_all(self):
+        with self.condition:
+            for connection, _ in self.idle:
+                close_quietly(connection)
+            self.idle = []
+
+# Function to close a connection, ignoring errors from sessions that are already gone
+def close_quietly(connection):
     try:
-        cursor = connection.cursor()
-        create_table_query = f"CREATE TABLE {table_name} ({column_definitions})"
-        cursor.execute(create_table_query)
-        connection.commit()
-        print(f"Table '{table_name}' created successfully in Azure SQL Database!")
+        connection.close()
+    except Exception:
+        pass
 
-    except Exception as e:
-        print(f"An error occurred: {e}")
-        return None
+CONNECT_FUNCTIONS = {
+    'aws': connect_to_aws_rds,
+    'azure': connect_to_azure_sql,
+    'gcp': connect_to_google_cloud_sql,
+}
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+# Function to get the shared connection pool for a provider and set of connection settings
+def get_connection_pool(provider, *connect_args, pool_size=4, max_idle_seconds=300, **connect_kwargs):
+    """Returns the pool for these settings, creating it on first use so every caller shares it."""
+    key = (provider, connect_args, tuple(sorted(connect_kwargs.items())))
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            connect_function = CONNECT_FUNCTIONS[provider]
+            pool = ConnectionPool(lambda: connect_function(*connect_args, **connect_kwargs),
+                                  pool_size=pool_size, max_idle_seconds=max_idle_seconds)
+            _pools[key] = pool
+        else:
+            pool.pool_size = max(pool.pool_size, pool_size)
+        return pool
 
-# Function to create a table in Google Cloud SQL
-def create_table_gcloud_sql(connection, table_name, column_definitions):
+# Function to close every pooled connection, e.g. before the program exits
+def close_all_pools():
+    with _pools_lock:
+        for pool in _pools.values():
+            pool.close_all()
+        _pools.clear()
+
+# Function to create a table in any supported database
+def create_table(connection, table_name, column_definitions, dialect=None):
+    """Runs CREATE TABLE for column_definitions in the connection's dialect, skipping tables that exist."""
     try:
+        dialect = dialect or dialect_for_connection(connection)
         cursor = connection.cursor()
-        create_table_query =  f"CREATE TABLE IF NOT EXISTS {table_name} ({column_definitions})"
-        cursor.execute(create_table_query)
+        cursor.execute(dialect.create_table_sql(table_name, column_definitions))
         connection.commit()
-        print(f"Table '{table_name}' created successfully in Google Cloud SQL Database!")
+        SCHEMA_CACHE.invalidate(connection)
+        print(f"Table '{table_name}' created successfully!")
 
     except Exception as e:
         print(f"An error occurred: {e}")
-        return None
+
+# Rows fetched from the server per round trip when a result set is streamed
+DEFAULT_FETCH_SIZE = 10000
+
+# Function to stream a query's result set as (columns, rows) batches of at most fetch_size rows
+def iter_query_batches(connection, query, params=None, fetch_size=DEFAULT_FETCH_SIZE):
+    """Reads with an unbuffered cursor so rows are pulled from the server as they are consumed."""
+    cursor = connection.cursor(buffered=False) if hasattr(connection, 'ping') else connection.cursor()
+    try:
+        if params:
+            cursor.execute(query, params)
+        else:
+            cursor.execute(query)
+        columns = [column[0] for column in cursor.description]
+        while True:
+            rows = cursor.fetchmany(fetch_size)
+            if not rows:
+                break
+            yield columns, rows
+    finally:
+        cursor.close()
@@ -1,28 +1,502 @@
 import argparse
+import glob
+import math
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+from xml.etree.ElementTree import iterparse
+from xml.sax.saxutils import escape
+import numpy as np
 import pandas as pd
+from openpyxl import Workbook, load_workbook
+from uploaddata import iter_excel_chunks
+from workbookcache import cached_sheet_chunks
+from metrics import span, increment, timed_iter
 
-def convert_to_excel(input_file, output_file):
+DEFAULT_CHUNK_ROWS = 50000
+
+# xlsx sheets hold 1,048,576 rows, one of which is the header
+XLSX_MAX_DATA_ROWS = 1048576 - 1
+
+SUPPORTED_FORMATS = ['csv', 'txt', 'json', 'jsonl', 'xml', 'xls', 'xlsx', 'parquet']
+
+# Function to work out a file's format from its extension
+def detect_format(file_path):
+    extension = os.path.splitext(file_path)[1].lower().lstrip('.')
+    if extension not in SUPPORTED_FORMATS:
+        raise ValueError(f"Unsupported file format '.{extension}'. Supported formats: {', '.join(SUPPORTED_FORMATS)}")
+    return extension
+
+# Function to check whether a JSON file holds one array rather than one record per line
+def is_json_array(file_path):
+    with open(file_path, encoding='utf-8') as handle:
+        while True:
+            char = handle.read(1)
+            if not char or not char.isspace():
+                return char == '['
+
+# Function to stream records out of an XML file laid out as <root><row><col>value</col>...</row>...</root>
+def iter_xml_chunks(file_path, chunk_rows):
+    records = []
+    depth = 0
+    root = None
+    for event, element in iterparse(file_path, events=('start', 'end')):
+        if event == 'start':
+            if root is None:
+                root = element
+            depth += 1
+            continue
+
+        depth -= 1
+        if depth != 1:
+            continue
+
+        # A finished row element: its attributes and child elements become columns
+        record = dict(element.attrib)
+        for child in element:
+            record[child.tag] = child.text
+        records.append(record)
+        # The root keeps every finished row as a child; dropping them keeps memory flat
+        root.clear()
+
+        if len(records) >= chunk_rows:
+            yield xml_records_to_dataframe(records)
+            records = []
+
+    if records:
+        yield xml_records_to_dataframe(records)
+
+# Function to turn XML text values back into numbers where a whole column is numeric
+def xml_records_to_dataframe(records):
+    df = pd.DataFrame.from_records(records)
+    for col in df.columns:
+        try:
+            df[col] = pd.to_numeric(df[col])
+        except (ValueError, TypeError):
+            pass
+    return df
+
+# Function to stream an xlsx file, following on to the next sheets when they continue the first one
+def iter_xlsx_chunks(file_path, chunk_rows):
+    """Reads the first sheet, plus any following sheets with the same header (see read_chunks' all_sheets).
+
+    Sheets are split that way when a file is written with more rows than one sheet can hold.
+    """
+    workbook = load_workbook(file_path, read_only=True)
     try:
-        if input_file.endswith('.csv'):
-            df = pd.read_csv(input_file)
-        elif input_file.endswith('.txt'):
-            df = pd.read_csv(input_file, delimiter='\t')
+        headers = [next(worksheet.iter_rows(max_row=1, values_only=True), None) for worksheet in workbook.worksheets]
+    finally:
+        workbook.close()
+
+    for index, header in enumerate(headers):
+        if index > 0 and header != headers[0]:
+            break
+        yield from iter_excel_chunks(file_path, index, chunk_rows)
+
+# Function to stream row batches out of a Parquet file
+def iter_parquet_chunks(file_path, chunk_rows):
+    import pyarrow.parquet as pq
+    for batch in pq.ParquetFile(file_path).iter_batches(batch_size=chunk_rows):
+        yield batch.to_pandas()
+
+# Function to read any supported input file as a stream of DataFrames
+def read_chunks(input_file, chunk_rows=DEFAULT_CHUNK_ROWS, sheet_name=None, all_sheets=False):
+    """all_sheets makes an xlsx input without sheet_name continue onto following sheets with the same header."""
+    input_format = detect_format(input_file)
+
+    if input_format == 'csv':
+        return pd.read_csv(input_file, chunksize=chunk_rows)
+    if input_format == 'txt':
+        return pd.read_csv(input_file, delimiter='\t', chunksize=chunk_rows)
+    if input_format == 'jsonl' or (input_format == 'json' and not is_json_array(input_file)):
+        return pd.read_json(input_file, lines=True, chunksize=chunk_rows)
+    if input_format == 'json':
+        # A single JSON array cannot be split without parsing it whole
+        return [pd.read_json(input_file, orient='records')]
+    if input_format == 'xml':
+        return iter_xml_chunks(input_file, chunk_rows)
+    if input_format == 'xlsx':
+        if sheet_name is None:
+            return iter_xlsx_chunks(input_file, chunk_rows) if all_sheets else iter_excel_chunks(input_file, 0, chunk_rows)
+        return iter_excel_chunks(input_file, sheet_name, chunk_rows)
+    if input_format == 'xls':
+        # The legacy binary format has no streaming reader
+        return [pd.read_excel(input_file, sheet_name=sheet_name if sheet_name is not None else 0)]
+    return iter_parquet_chunks(input_file, chunk_rows)
+
+# Writer for comma- or tab-separated text
+class DelimitedWriter:
+    def __init__(self, output_file, delimiter=','):
+        self.handle = open(output_file, 'w', encoding='utf-8', newline='')
+        self.delimiter = delimiter
+        self.header_written = False
+
+    def write(self, df):
+        df.to_csv(self.handle, sep=self.delimiter, index=False, header=not self.header_written)
+        self.header_written = True
+
+    def close(self):
+        self.handle.close()
+
+# Writer for JSON, either one array of records or one record per line
+class JsonWriter:
+    def __init__(self, output_file, lines=False):
+        self.handle = open(output_file, 'w', encoding='utf-8')
+        self.lines = lines
+        self.first = True
+        if not lines:
+            self.handle.write('[')
+
+    def write(self, df):
+        if df.empty:
+            return
+        text = df.to_json(orient='records', lines=True, date_format='iso', double_precision=15).rstrip('\n')
+        if self.lines:
+            self.handle.write(text + '\n')
         else:
-            raise ValueError("Unsupported input file format. Only .csv and .txt files are supported.")
+            self.handle.write(('' if self.first else ',') + text.replace('\n', ','))
+        self.first = False
+
+    def close(self):
+        if not self.lines:
+            self.handle.write(']')
+        self.handle.close()
+
+# Writer for XML in the same <data><row>...</row></data> layout that pandas uses
+class XmlWriter:
+    def __init__(self, output_file):
+        self.handle = open(output_file, 'w', encoding='utf-8')
+        self.handle.write("<?xml version='1.0' encoding='utf-8'?>\n<data>\n")
+        self.tags = None
+
+    @staticmethod
+    def to_tag(name):
+        tag = re.sub(r'[^\w.-]', '_', str(name))
+        return tag if re.match(r'[A-Za-z_]', tag) else f'_{tag}'
+
+    def write(self, df):
+        if self.tags is None:
+            self.tags = [self.to_tag(col) for col in df.columns]
+
+        for row in df.itertuples(index=False, name=None):
+            fields = []
+            for tag, value in zip(self.tags, row):
+                if is_missing(value):
+                    fields.append(f"<{tag}/>")
+                else:
+                    fields.append(f"<{tag}>{escape(str(value))}</{tag}>")
+            self.handle.write("  <row>" + "".join(fields) + "</row>\n")
+
+    def close(self):
+        self.handle.write("</data>\n")
+        self.handle.close()
+
+# Writer for xlsx that streams rows to disk and starts a new sheet when one is full
+class XlsxWriter:
+    def __init__(self, output_file):
+        self.output_file = output_file
+        # Write-only workbooks flush rows as they are appended instead of keeping every cell in memory
+        self.workbook = Workbook(write_only=True)
+        self.header = None
+        self.sheet = None
+        self.sheet_rows = 0
+
+    def new_sheet(self):
+        self.sheet = self.workbook.create_sheet(f"Sheet{len(self.workbook.worksheets) + 1}")
+        self.sheet.append(self.header)
+        self.sheet_rows = 0
+
+    def write(self, df):
+        if self.header is None:
+            self.header = [str(col) for col in df.columns]
+            self.new_sheet()
+
+        for row in df.itertuples(index=False, name=None):
+            if self.sheet_rows >= XLSX_MAX_DATA_ROWS:
+                self.new_sheet()
+            # openpyxl would store numpy booleans (from nullable boolean columns) as 1 and 0
+            self.sheet.append([None if is_missing(value) else bool(value) if isinstance(value, np.bool_) else value
+                               for value in row])
+            self.sheet_rows += 1
+
+    def close(self):
+        if self.sheet is None:
+            self.workbook.create_sheet("Sheet1")
+        self.workbook.save(self.output_file)
+
+# Largest precision of a Parquet decimal128 column
+MAX_DECIMAL_PRECISION = 38
+
+# Function to pick a Parquet type that holds the values of two chunks' types
+def unify_arrow_types(first, second):
+    import pyarrow as pa
+
+    if first == second or pa.types.is_null(second):
+        return first
+    if pa.types.is_null(first):
+        return second
+    if pa.types.is_integer(first) and pa.types.is_integer(second):
+        return pa.int64()
+    if pa.types.is_decimal(first) and pa.types.is_decimal(second):
+        # Enough integer digits and enough scale for both, while that fits a decimal128
+        scale = max(first.scale, second.scale)
+        integer_digits = max(first.precision - first.scale, second.precision - second.scale)
+        if integer_digits + scale <= MAX_DECIMAL_PRECISION:
+            return pa.decimal128(integer_digits + scale, scale)
+        return pa.float64()
+    if pa.types.is_decimal(first) or pa.types.is_decimal(second):
+        # Decimals mixed with other numbers are stored as doubles
+        if all(pa.types.is_integer(t) or pa.types.is_floating(t) or pa.types.is_decimal(t) for t in (first, second)):
+            return pa.float64()
+        return pa.string()
+    if (pa.types.is_integer(first) or pa.types.is_floating(first)) and \
+            (pa.types.is_integer(second) or pa.types.is_floating(second)):
+        return pa.float64()
+    # Anything else (numbers in one chunk and text in another, say) is kept as text
+    return pa.string()
+
+# Writer for Parquet that appends each chunk as a row group
+class ParquetWriter:
+    """Writes chunks as row groups of one file.
+
+    Each chunk's types are inferred on their own, so a column can be blank in the first chunk and
+    text in a later one. When a chunk does not fit the file's schema, the schema is widened (see
+    unify_arrow_types) and the row groups written so far are rewritten with it.
+    """
+
+    def __init__(self, output_file):
+        self.output_file = output_file
+        self.writer = None
+        self.schema = None
 
-        # Write the DataFrame to an Excel file
-        df.to_excel(output_file, index=False)
-        print(f"Conversion successful. Excel file saved as {output_file}")
+    def write(self, df):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        if self.writer is None:
+            self.schema = table.schema
+            self.writer = pq.ParquetWriter(self.output_file, self.schema)
+        else:
+            schema = pa.schema([field.with_type(unify_arrow_types(field.type, table.schema.field(field.name).type))
+                                for field in self.schema])
+            if not schema.equals(self.schema):
+                self.rewrite(schema)
+            table = table.select(self.schema.names).cast(self.schema)
+        self.writer.write_table(table)
+
+    def rewrite(self, schema):
+        """Switches to a wider schema, copying the row groups already written into a new file."""
+        import pyarrow.parquet as pq
+
+        self.writer.close()
+        previous_path = self.output_file + '.previous'
+        os.replace(self.output_file, previous_path)
+        try:
+            # pandas metadata describes the old dtypes, so it is not carried over
+            self.schema = schema.remove_metadata()
+            self.writer = pq.ParquetWriter(self.output_file, self.schema)
+            previous = pq.ParquetFile(previous_path)
+            for index in range(previous.num_row_groups):
+                self.writer.write_table(previous.read_row_group(index).cast(self.schema))
+            previous.close()
+        finally:
+            os.remove(previous_path)
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+# Function to check for NaN, NaT, pd.NA (nullable integer and boolean columns) and None in a single value
+def is_missing(value):
+    if value is None or value is pd.NaT or value is pd.NA:
+        return True
+    return isinstance(value, float) and math.isnan(value)
+
+# Function to create the writer for an output file
+def open_writer(output_file):
+    output_format = detect_format(output_file)
+
+    if output_format == 'csv':
+        return DelimitedWriter(output_file)
+    if output_format == 'txt':
+        return DelimitedWriter(output_file, delimiter='\t')
+    if output_format in ('json', 'jsonl'):
+        return JsonWriter(output_file, lines=output_format == 'jsonl')
+    if output_format == 'xml':
+        return XmlWriter(output_file)
+    if output_format == 'xlsx':
+        return XlsxWriter(output_file)
+    if output_format == 'parquet':
+        return ParquetWriter(output_file)
+    raise ValueError("Writing .xls is not supported; use .xlsx instead.")
+
+# Function to convert a file to another format, one chunk at a time
+def convert_file(input_file, output_file, chunk_rows=DEFAULT_CHUNK_ROWS, sheet_name=None, use_cache=True,
+                 all_sheets=False):
+    """Streams input_file into output_file; both formats come from the file extensions.
+
+    Only Excel inputs go through the parsed-file cache: other formats are about as quick to read
+    again as the cache is, so caching them would only fill the cache directory.
+    Returns the number of rows written.
+    """
+    # Validate the output format before reading anything
+    detect_format(output_file)
+    if detect_format(input_file) in ('xlsx', 'xls'):
+        reader = f"convert:{chunk_rows}" + (":all-sheets" if all_sheets else "")
+        chunks = cached_sheet_chunks(input_file, '' if sheet_name is None else sheet_name, reader,
+                                     lambda: read_chunks(input_file, chunk_rows, sheet_name, all_sheets),
+                                     use_cache, chunk_rows)
+    else:
+        chunks = read_chunks(input_file, chunk_rows, sheet_name, all_sheets)
+
+    writer = open_writer(output_file)
+    rows = 0
+    try:
+        for df in timed_iter(chunks, 'convert.read'):
+            with span('convert.write'):
+                writer.write(df)
+            rows += len(df)
+            increment('convert.rows', len(df))
+    except Exception:
+        # Do not leave a half-written output file behind
+        writer.close()
+        if os.path.exists(output_file):
+            os.remove(output_file)
+        raise
+
+    writer.close()
+    return rows
+
+def convert_to_excel(input_file, output_file, use_cache=True, chunk_rows=DEFAULT_CHUNK_ROWS, sheet_name=None,
+                     all_sheets=False):
+    try:
+        rows = convert_file(input_file, output_file, chunk_rows=chunk_rows, sheet_name=sheet_name, use_cache=use_cache,
+                            all_sheets=all_sheets)
+        print(f"Conversion successful. {rows} rows saved as {output_file}")
     except Exception as e:
         print(f"Conversion failed: {str(e)}")
 
-def main():
-    parser = argparse.ArgumentParser(description="Convert CSV and text files to Excel")
-    parser.add_argument("input_file", help="Input CSV or text file")
-    parser.add_argument("output_file", help="Output Excel file")
-    args = parser.parse_args()
+# Function to expand files, directories and glob patterns into a list of input files
+def expand_inputs(inputs):
+    files = []
+    for item in inputs:
+        if os.path.isdir(item):
+            candidates = [os.path.join(item, name) for name in sorted(os.listdir(item))]
+        elif os.path.exists(item):
+            candidates = [item]
+        else:
+            candidates = sorted(glob.glob(item, recursive=True))
 
-    convert_to_excel(args.input_file, args.output_file)
+        for candidate in candidates:
+            extension = os.path.splitext(candidate)[1].lower().lstrip('.')
+            if os.path.isfile(candidate) and extension in SUPPORTED_FORMATS:
+                files.append(candidate)
+    return files
+
+# Function run in a worker process to convert one file and time it
+def convert_one(input_file, output_file, chunk_rows, sheet_name, use_cache, all_sheets=False):
+    start = time.perf_counter()
+    try:
+        rows = convert_file(input_file, output_file, chunk_rows=chunk_rows, sheet_name=sheet_name, use_cache=use_cache,
+                            all_sheets=all_sheets)
+        return {'input': input_file, 'output': output_file, 'rows': rows, 'seconds': time.perf_counter() - start, 'error': None}
+    except Exception as e:
+        return {'input': input_file, 'output': output_file, 'rows': 0, 'seconds': time.perf_counter() - start, 'error': str(e)}
+
+# Function to convert many files into one output directory in parallel
+def convert_batch(inputs, output_dir, target_format, workers=None, chunk_rows=DEFAULT_CHUNK_ROWS, sheet_name=None, use_cache=True,
+                  all_sheets=False):
+    """Converts every file found in inputs to target_format inside output_dir.
+
+    Conversions run in a pool of worker processes, so pandas and friends are imported once per
+    worker rather than once per file. Returns one result dict per file, in input order.
+    """
+    target_format = target_format.lower().lstrip('.')
+    if target_format not in SUPPORTED_FORMATS or target_format == 'xls':
+        raise ValueError(f"Unsupported target format '{target_format}'")
+
+    os.makedirs(output_dir, exist_ok=True)
+    input_files = expand_inputs(inputs)
+
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count() or 1) as pool:
+        futures = []
+        used_names = set()
+        for input_file in input_files:
+            stem, extension = os.path.splitext(os.path.basename(input_file))
+            name = f"{stem}.{target_format}"
+            if name.lower() in used_names:
+                # Keep same-named inputs (a.csv, a.json, dir/a.csv) from writing over each other
+                name = f"{stem}_{extension.lstrip('.')}.{target_format}"
+                counter = 2
+                while name.lower() in used_names:
+                    name = f"{stem}_{extension.lstrip('.')}_{counter}.{target_format}"
+                    counter += 1
+            used_names.add(name.lower())
+            output_file = os.path.join(output_dir, name)
+            futures.append(pool.submit(convert_one, input_file, output_file, chunk_rows, sheet_name, use_cache, all_sheets))
+
+        return [future.result() for future in futures]
+
+# Function to print per-file timing and failures for a batch conversion
+def print_conversion_summary(results, elapsed):
+    failed = [result for result in results if result['error']]
+    total_rows = sum(result['rows'] for result in results)
+    print(f"Converted {len(results) - len(failed)} of {len(results)} files ({total_rows} rows) in {elapsed:.2f}s")
+    for result in results:
+        if result['error']:
+            print(f"  [FAILED] {result['input']}: {result['error']}")
+        else:
+            print(f"  [OK] {result['input']} -> {result['output']}: {result['rows']} rows in {result['seconds']:.2f}s")
+
+# Function to run a single or batch conversion from command line arguments
+def run_convert(files, output_dir=None, target_format=None, workers=None, chunk_rows=DEFAULT_CHUNK_ROWS, sheet_name=None, use_cache=True,
+                all_sheets=False):
+    # 'convert in.csv out.xlsx' keeps working; anything else is a batch
+    if output_dir is None and target_format is None:
+        if len(files) != 2:
+            print("Conversion failed: give an input and an output file, or use --output-dir and --to for many inputs")
+            return
+        convert_to_excel(files[0], files[1], use_cache=use_cache, chunk_rows=chunk_rows, sheet_name=sheet_name,
+                         all_sheets=all_sheets)
+        return
+
+    if target_format is None:
+        print("Conversion failed: --to is required when converting into a directory")
+        return
+
+    start = time.perf_counter()
+    try:
+        results = convert_batch(files, output_dir or '.', target_format, workers=workers, chunk_rows=chunk_rows,
+                                sheet_name=sheet_name, use_cache=use_cache, all_sheets=all_sheets)
+    except Exception as e:
+        print(f"Conversion failed: {str(e)}")
+        return
+    print_conversion_summary(results, time.perf_counter() - start)
+
+# Function to add the conversion options to a parser; shared by this script and the main CLI
+def add_arguments(parser):
+    parser.add_argument("files", nargs='+', help="Input and output file, or with --output-dir/--to any number of input files, directories or globs")
+    parser.add_argument("--output-dir", help="Directory to write batch conversions into")
+    parser.add_argument("--to", dest="target_format", help="Target format for batch conversions, e.g. xlsx or parquet")
+    parser.add_argument("--workers", type=int, help="Number of worker processes for batch conversions (default: CPU count)")
+    parser.add_argument("--sheet", help="Sheet to read from an Excel input (default: the first sheet)")
+    parser.add_argument("--all-sheets", action="store_true", help="Continue an Excel input onto the following sheets that have the same header as the first")
+    parser.add_argument("--chunk-rows", type=int, default=DEFAULT_CHUNK_ROWS, help="Rows read and written per chunk")
+    parser.add_argument("--no-cache", action="store_true", help="Do not read or write the parsed-file cache (used for Excel inputs only)")
+
+def run(args, parser):
+    if args.sheet is not None and args.all_sheets:
+        parser.error("--sheet and --all-sheets cannot be combined")
+    run_convert(args.files, output_dir=args.output_dir, target_format=args.target_format, workers=args.workers,
+                chunk_rows=args.chunk_rows, sheet_name=args.sheet, use_cache=not args.no_cache,
+                all_sheets=args.all_sheets)
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert between CSV, text, JSON, XML, Excel and Parquet files")
+    add_arguments(parser)
+    run(parser.parse_args(), parser)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -1,4 +1,6 @@
 from contextlib import contextmanager
+from metrics import span
+from schemacache import SCHEMA_CACHE
 
 @contextmanager
 def mysql_cursor(connection):
@@ -26,9 +28,11 @@ def create_custom_table(connection, table_name, columns):
             table_creation_sql = table_creation_sql.rstrip(',') + ');'
 
             # Execute the SQL statement
-            cursor.execute(table_creation_sql)
+            with span('create_table.execute'):
+                cursor.execute(table_creation_sql)
         
         connection.commit()
+        SCHEMA_CACHE.invalidate(connection)
         print(f"Table '{table_name}' created successfully!")
 
     except Exception as e:
@@ -43,19 +47,9 @@ def is_reserved_keyword(word):
 # Function to list all tables in a database
 def list_tables(connection):
     try:
-        # Create a cursor object using the connection
-        with mysql_cursor(connection) as cursor:
-            # SQL statement to list all tables
-            list_tables_sql = """
-                SHOW TABLES;
-            """
-            # Execute the SQL statement
-            cursor.execute(list_tables_sql)
-            # Fetch all rows from the result of the SQL statement
-            # and extract the first column (table name) from each row
-            existing_tables = [row[0] for row in cursor.fetchall()]
-        # Return the list of table names
-        return existing_tables
+        # Table names come from the schema metadata cache, which fetches every table's columns
+        # in the same round trip so later checks against them need no further queries
+        return sorted(SCHEMA_CACHE.tables(connection))
 
     except Exception as e:
         # Print an error message if something goes wrong
@@ -0,0 +1,445 @@
+# SQL differences between the databases Centerspoke uploads to
+class Dialect:
+    """Type mapping, identifier quoting and statement shapes for one database engine.
+
+    Column types are inferred from the values of a column, not just its pandas dtype; when
+    sampled is True the values are only part of the sheet, so sizes get some headroom and
+    float and date columns get types that also hold the fractions and times of unseen rows.
+    """
+
+    name = None
+    placeholder = '%s'
+
+    # Integer column types from narrowest to widest, with the values each one can hold
+    integer_types = []
+    # A sample may not contain the extremes, so sampled columns never get a type narrower than this
+    sampled_integer_floor = 'INT'
+    max_decimal_precision = 65
+    max_decimal_scale = 30
+    max_varchar_length = 16383
+
+    boolean_type = 'BOOLEAN'
+    double_type = 'DOUBLE'
+    date_type = 'DATE'
+    datetime_type = 'DATETIME'
+    varchar_type = 'VARCHAR'
+    large_text_type = 'MEDIUMTEXT'
+    time_type = 'TIME'
+    # Whether TIME only holds a time of day rather than an interval
+    time_of_day_only = False
+    binary_type = 'LONGBLOB'
+    # Types used when a column has no values to look at, by pandas dtype
+    fallback_types = {'int': 'INT', 'float': 'FLOAT', 'datetime': 'DATETIME', 'bool': 'BOOLEAN'}
+    fallback_text_type = 'VARCHAR(255)'
+
+    # Load strategies this engine supports, and the one 'auto' falls back to
+    load_strategies = ()
+    default_load_strategy = 'multirow'
+    # Limits on a single INSERT ... VALUES statement, if the engine has any
+    max_insert_rows = None
+    max_parameters = None
+
+    # SQL for the aggregates the analyze command pushes down to the server
+    aggregate_templates = {
+        'count': 'COUNT({0})',
+        'distinct': 'COUNT(DISTINCT {0})',
+        'sum': 'SUM({0})',
+        'avg': 'AVG({0})',
+        'min': 'MIN({0})',
+        'max': 'MAX({0})',
+        'stddev': 'STDDEV_SAMP({0})',
+        'length': 'MAX(CHAR_LENGTH({0}))',
+    }
+
+    def quote(self, identifier):
+        raise NotImplementedError
+
+    def column_list(self, columns):
+        return ', '.join([self.quote(col) for col in columns])
+
+    def fallback_type(self, pandas_dtype):
+        """Maps a pandas dtype to a column type without looking at any values."""
+        for prefix, type_name in self.fallback_types.items():
+            if pandas_dtype.name.startswith(prefix):
+                return type_name
+        return self.fallback_text_type
+
+    def integer_type(self, min_value, max_value, sampled=False):
+        allowed = False
+        for type_name, lowest, highest in self.integer_types:
+            allowed = allowed or not sampled or type_name == self.sampled_integer_floor
+            if allowed and lowest <= min_value and max_value <= highest:
+                return type_name
+        return f'DECIMAL({self.max_decimal_precision}, 0)'
+
+    def text_type(self, max_length):
+        if max_length > self.max_varchar_length:
+            return self.large_text_type
+        return f'{self.varchar_type}({max(max_length, 1)})'
+
+    def column_type(self, series, sampled=False):
+        # Imported here so connecting and creating tables does not load pandas
+        import numpy as np
+        import pandas as pd
+
+        values = series.dropna()
+        if values.empty:
+            return self.fallback_type(series.dtype)
+
+        kind = series.dtype.kind
+
+        if kind == 'b':
+            return self.boolean_type
+
+        if kind in 'iu':
+            return self.integer_type(int(values.min()), int(values.max()), sampled)
+
+        if kind == 'f':
+            # Rows past the sample may have fractions, or more digits than a DECIMAL sized from it
+            if sampled or not np.isfinite(values).all():
+                return self.double_type
+            # Columns of whole numbers read as floats only because they contain blanks
+            if (values % 1 == 0).all() and values.abs().max() < 2**53:
+                return self.integer_type(int(values.min()), int(values.max()), sampled)
+
+            text = values.astype('float64').abs().astype(str)
+            if text.str.contains('e', regex=False).any():
+                return self.double_type
+            parts = text.str.split('.', n=1, expand=True)
+            integer_digits = int(parts[0].str.len().max())
+            scale = int(parts[1].str.rstrip('0').str.len().max())
+            precision = integer_digits + scale
+            if precision > self.max_decimal_precision or scale > self.max_decimal_scale:
+                return self.double_type
+            return f'DECIMAL({precision}, {scale})'
+
+        if kind == 'M':
+            # Only drop the time part if no value has one, and rows past the sample cannot add one
+            if not sampled and (values.dt.normalize() == values).all():
+                return self.date_type
+            return self.datetime_type
+
+        # Object columns hold Python values; blanks stop pandas from giving them a proper dtype
+        inferred = pd.api.types.infer_dtype(values, skipna=True)
+        if inferred == 'boolean':
+            return self.boolean_type
+        if inferred == 'integer':
+            return self.integer_type(int(values.min()), int(values.max()), sampled)
+        if inferred in ('datetime', 'date'):
+            return self.column_type(pd.to_datetime(values), sampled)
+
+        # Size text columns to the longest observed value
+        max_length = int(values.astype(str).str.len().max())
+        if sampled:
+            max_length = max(16, 1 << (max_length - 1).bit_length())
+        return self.text_type(max_length)
+
+    def create_table_sql(self, table_name, column_definitions):
+        return f"CREATE TABLE IF NOT EXISTS {table_name} ({column_definitions});"
+
+    def columns_query(self, table_name):
+        """Returns (sql, params) for (name, data type, character length, precision, scale, nullable, unsigned)
+        rows describing each column of a table, in column order."""
+        raise NotImplementedError
+
+    def primary_key_query(self, table_name):
+        """Returns (sql, params) for the table's primary key columns, in key order."""
+        raise NotImplementedError
+
+    def translate_column_type(self, column, source):
+        """Maps a column described by source.columns_query to the closest type of this dialect."""
+        name, data_type, length, precision, scale, nullable, unsigned = column
+        data_type = data_type.lower()
+
+        if data_type in ('bit', 'bool', 'boolean') and (length or precision or 1) <= 1:
+            return self.boolean_type
+        if data_type == 'year':
+            return self.integer_type(0, 9999)
+        source_ranges = {type_name.lower(): (lowest, highest) for type_name, lowest, highest in source.integer_types}
+        if data_type in source_ranges or data_type == 'integer':
+            lowest, highest = source_ranges.get(data_type, (-2**31, 2**31 - 1))
+            if unsigned:
+                lowest, highest = 0, highest * 2 + 1
+            return self.integer_type(lowest, highest)
+        if data_type in ('decimal', 'numeric', 'money', 'smallmoney'):
+            precision, scale = (precision or 19, scale or 0) if data_type in ('decimal', 'numeric') else (19, 4)
+            if precision > self.max_decimal_precision or scale > self.max_decimal_scale:
+                return self.double_type
+            return f'DECIMAL({precision}, {scale})'
+        if data_type in ('float', 'double', 'real', 'double precision'):
+            return self.double_type
+        if data_type == 'date':
+            return self.date_type
+        if data_type in ('datetime', 'datetime2', 'smalldatetime', 'timestamp', 'datetimeoffset'):
+            return self.datetime_type
+        if data_type == 'time':
+            return self.time_type
+        if data_type in ('binary', 'varbinary', 'image', 'tinyblob', 'blob', 'mediumblob', 'longblob', 'bit'):
+            return self.binary_type
+        if data_type in ('char', 'varchar', 'nchar', 'nvarchar', 'enum', 'set', 'uniqueidentifier'):
+            # -1 is SQL Server's length for (MAX)
+            length = 36 if data_type == 'uniqueidentifier' else length
+            if length is None or length < 0 or length > self.max_varchar_length:
+                return self.large_text_type
+            return f'{self.varchar_type}({max(int(length), 1)})'
+        # text, ntext, json, xml and anything else without a direct counterpart
+        return self.large_text_type
+
+    def aggregate(self, function, expression):
+        if function not in self.aggregate_templates:
+            raise ValueError(f"Unknown aggregate '{function}'. Choose from: {', '.join(self.aggregate_templates)}")
+        return self.aggregate_templates[function].format(expression)
+
+    def select_limited(self, select_list, rest, limit=None):
+        """Builds SELECT select_list rest, returning at most limit rows."""
+        suffix = f" LIMIT {int(limit)}" if limit else ''
+        return f"SELECT {select_list} {rest}{suffix};"
+
+    def table_version_query(self, table_name):
+        """Returns (sql, params) for one row of values that change whenever the table's data does."""
+        raise NotImplementedError
+
+    # Statement run before table_version_query so the values it reads are current, if the server caches them
+    table_version_setup_sql = None
+
+    # Session variables switched off while a load-optimized upload runs
+    load_session_settings = {}
+
+    def session_settings_query(self):
+        names = ', '.join([f"@@SESSION.{name}" for name in self.load_session_settings])
+        return f"SELECT {names};"
+
+    def set_session_sql(self, values):
+        assignments = ', '.join([f"{name} = {int(value)}" for name, value in values.items()])
+        return f"SET SESSION {assignments};"
+
+    def deferrable_indexes_query(self, table_name):
+        """Returns (sql, params) listing the non-unique secondary indexes that can be rebuilt after a load,
+        as (index name, column definition) rows in column order."""
+        return None
+
+    def defer_index_sql(self, table_name, index_name):
+        raise NotImplementedError
+
+    def restore_indexes_sql(self, table_name, indexes):
+        """Statements rebuilding deferred indexes, given {index name: [column definitions]}."""
+        raise NotImplementedError
+
+    def schema_metadata_sql(self):
+        """One query returning (table, column, data type, nullable, default, auto-generated, row estimate)
+        for every column of every table in the current database, in column order."""
+        raise NotImplementedError
+
+    def upsert_clause(self, columns):
+        raise ValueError(f"Upserts are not supported for {self.name}")
+
+# MySQL, used by AWS RDS and Google Cloud SQL
+class MySQLDialect(Dialect):
+    name = 'mysql'
+
+    integer_types = [
+        ('TINYINT', -2**7, 2**7 - 1),
+        ('SMALLINT', -2**15, 2**15 - 1),
+        ('MEDIUMINT', -2**23, 2**23 - 1),
+        ('INT', -2**31, 2**31 - 1),
+        ('BIGINT', -2**63, 2**63 - 1),
+    ]
+
+    load_strategies = ('executemany', 'multirow', 'load-data')
+
+    def quote(self, identifier):
+        return f"`{identifier}`"
+
+    def schema_metadata_sql(self):
+        # TABLE_ROWS is InnoDB's estimate, which costs nothing to read unlike COUNT(*)
+        return (
+            "SELECT c.TABLE_NAME, c.COLUMN_NAME, c.DATA_TYPE, c.IS_NULLABLE, c.COLUMN_DEFAULT, "
+            "c.EXTRA LIKE '%auto_increment%', t.TABLE_ROWS "
+            "FROM information_schema.COLUMNS c "
+            "JOIN information_schema.TABLES t ON t.TABLE_SCHEMA = c.TABLE_SCHEMA AND t.TABLE_NAME = c.TABLE_NAME "
+            "WHERE c.TABLE_SCHEMA = DATABASE() AND t.TABLE_TYPE = 'BASE TABLE' "
+            "ORDER BY c.TABLE_NAME, c.ORDINAL_POSITION;"
+        )
+
+    def columns_query(self, table_name):
+        return (
+            "SELECT COLUMN_NAME, DATA_TYPE, CHARACTER_MAXIMUM_LENGTH, NUMERIC_PRECISION, NUMERIC_SCALE, "
+            "IS_NULLABLE = 'YES', COLUMN_TYPE LIKE '%unsigned%' FROM information_schema.COLUMNS "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s ORDER BY ORDINAL_POSITION;",
+            (table_name,)
+        )
+
+    def primary_key_query(self, table_name):
+        return (
+            "SELECT COLUMN_NAME FROM information_schema.KEY_COLUMN_USAGE "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND CONSTRAINT_NAME = 'PRIMARY' "
+            "ORDER BY ORDINAL_POSITION;",
+            (table_name,)
+        )
+
+    def table_version_query(self, table_name):
+        # UPDATE_TIME is NULL for tables not written since the server started; callers treat that as unknown
+        return (
+            "SELECT UPDATE_TIME, TABLE_ROWS, DATA_LENGTH, AUTO_INCREMENT FROM information_schema.TABLES "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s;",
+            (table_name,)
+        )
+
+    # MySQL 8 serves information_schema.TABLES statistics from a cache refreshed once a day by default
+    table_version_setup_sql = "SET SESSION information_schema_stats_expiry = 0;"
+
+    load_session_settings = {'unique_checks': 0, 'foreign_key_checks': 0}
+
+    def deferrable_indexes_query(self, table_name):
+        # Unique indexes stay, since they enforce constraints, and so do full-text, spatial and functional ones
+        return (
+            "SELECT INDEX_NAME, CONCAT('`', REPLACE(COLUMN_NAME, '`', '``'), '`', "
+            "IF(SUB_PART IS NULL, '', CONCAT('(', SUB_PART, ')')), IF(COLLATION = 'D', ' DESC', '')) "
+            "FROM information_schema.STATISTICS "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND NON_UNIQUE = 1 AND INDEX_TYPE = 'BTREE' "
+            "AND INDEX_NAME NOT IN (SELECT INDEX_NAME FROM information_schema.STATISTICS "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND COLUMN_NAME IS NULL) "
+            "ORDER BY INDEX_NAME, SEQ_IN_INDEX;",
+            (table_name, table_name)
+        )
+
+    def defer_index_sql(self, table_name, index_name):
+        return f"ALTER TABLE {self.quote(table_name)} DROP INDEX {self.quote(index_name)};"
+
+    def restore_indexes_sql(self, table_name, indexes):
+        # One ALTER TABLE builds every index in a single pass over the rows
+        additions = ', '.join([f"ADD INDEX {self.quote(name)} ({', '.join(columns)})" for name, columns in indexes.items()])
+        return [f"ALTER TABLE {self.quote(table_name)} {additions};"]
+
+    def upsert_clause(self, columns):
+        updates = ', '.join([f'{self.quote(col)} = VALUES({self.quote(col)})' for col in columns])
+        return f" ON DUPLICATE KEY UPDATE {updates}"
+
+# Microsoft SQL Server, used by Azure SQL
+class SQLServerDialect(Dialect):
+    name = 'sqlserver'
+    placeholder = '?'
+
+    # TINYINT is unsigned in SQL Server
+    integer_types = [
+        ('TINYINT', 0, 2**8 - 1),
+        ('SMALLINT', -2**15, 2**15 - 1),
+        ('INT', -2**31, 2**31 - 1),
+        ('BIGINT', -2**63, 2**63 - 1),
+    ]
+    max_decimal_precision = 38
+    max_decimal_scale = 38
+    max_varchar_length = 4000
+
+    boolean_type = 'BIT'
+    double_type = 'FLOAT'
+    datetime_type = 'DATETIME2'
+    varchar_type = 'NVARCHAR'
+    large_text_type = 'NVARCHAR(MAX)'
+    binary_type = 'VARBINARY(MAX)'
+    time_of_day_only = True
+    fallback_types = {'int': 'INT', 'float': 'FLOAT', 'datetime': 'DATETIME2', 'bool': 'BIT'}
+    fallback_text_type = 'NVARCHAR(255)'
+
+    load_strategies = ('executemany', 'multirow', 'fast-executemany', 'openjson')
+    default_load_strategy = 'fast-executemany'
+    # SQL Server accepts at most 1000 rows in a VALUES list and 2100 parameters per statement
+    max_insert_rows = 1000
+    max_parameters = 2100
+
+    # AVG and SUM of an integer column are integers in SQL Server, and SUM overflows past INT
+    aggregate_templates = dict(Dialect.aggregate_templates, **{
+        'count': 'COUNT_BIG({0})',
+        'distinct': 'COUNT_BIG(DISTINCT {0})',
+        'sum': 'SUM(CAST({0} AS FLOAT))',
+        'avg': 'AVG(CAST({0} AS FLOAT))',
+        'stddev': 'STDEV({0})',
+        'length': 'MAX(LEN({0}))',
+    })
+
+    def quote(self, identifier):
+        return '[' + str(identifier).replace(']', ']]') + ']'
+
+    def create_table_sql(self, table_name, column_definitions):
+        # SQL Server has no CREATE TABLE IF NOT EXISTS
+        return f"IF OBJECT_ID(N'{table_name}', N'U') IS NULL CREATE TABLE {table_name} ({column_definitions});"
+
+    def columns_query(self, table_name):
+        return (
+            "SELECT COLUMN_NAME, DATA_TYPE, CHARACTER_MAXIMUM_LENGTH, NUMERIC_PRECISION, NUMERIC_SCALE, "
+            "CASE WHEN IS_NULLABLE = 'YES' THEN 1 ELSE 0 END, 0 FROM INFORMATION_SCHEMA.COLUMNS "
+            "WHERE TABLE_SCHEMA = SCHEMA_NAME() AND TABLE_NAME = ? ORDER BY ORDINAL_POSITION;",
+            (table_name,)
+        )
+
+    def primary_key_query(self, table_name):
+        return (
+            "SELECT k.COLUMN_NAME FROM INFORMATION_SCHEMA.TABLE_CONSTRAINTS c "
+            "JOIN INFORMATION_SCHEMA.KEY_COLUMN_USAGE k ON k.CONSTRAINT_SCHEMA = c.CONSTRAINT_SCHEMA "
+            "AND k.CONSTRAINT_NAME = c.CONSTRAINT_NAME "
+            "WHERE c.TABLE_SCHEMA = SCHEMA_NAME() AND c.TABLE_NAME = ? AND c.CONSTRAINT_TYPE = 'PRIMARY KEY' "
+            "ORDER BY k.ORDINAL_POSITION;",
+            (table_name,)
+        )
+
+    def select_limited(self, select_list, rest, limit=None):
+        prefix = f"TOP {int(limit)} " if limit else ''
+        return f"SELECT {prefix}{select_list} {rest};"
+
+    def table_version_query(self, table_name):
+        # The last write recorded by index usage stats, reset (to NULL) when the server restarts
+        return (
+            "SELECT MAX(s.last_user_update), (SELECT SUM(p.rows) FROM sys.partitions p "
+            "WHERE p.object_id = OBJECT_ID(?) AND p.index_id IN (0, 1)) "
+            "FROM sys.dm_db_index_usage_stats s WHERE s.database_id = DB_ID() AND s.object_id = OBJECT_ID(?);",
+            (table_name, table_name)
+        )
+
+    def deferrable_indexes_query(self, table_name):
+        # Disabled indexes keep their definition, so only the names are needed to rebuild them
+        return (
+            "SELECT name, NULL FROM sys.indexes WHERE object_id = OBJECT_ID(?) AND type = 2 "
+            "AND is_unique = 0 AND is_disabled = 0 ORDER BY name;",
+            (table_name,)
+        )
+
+    def defer_index_sql(self, table_name, index_name):
+        return f"ALTER INDEX {self.quote(index_name)} ON {self.quote(table_name)} DISABLE;"
+
+    def restore_indexes_sql(self, table_name, indexes):
+        return [f"ALTER INDEX {self.quote(name)} ON {self.quote(table_name)} REBUILD;" for name in indexes]
+
+    def schema_metadata_sql(self):
+        # Row estimates come from the heap or clustered index partitions, as sp_spaceused reports them
+        return (
+            "SELECT c.TABLE_NAME, c.COLUMN_NAME, c.DATA_TYPE, c.IS_NULLABLE, c.COLUMN_DEFAULT, "
+            "COLUMNPROPERTY(OBJECT_ID(QUOTENAME(c.TABLE_SCHEMA) + '.' + QUOTENAME(c.TABLE_NAME)), c.COLUMN_NAME, 'IsIdentity'), "
+            "(SELECT SUM(p.rows) FROM sys.partitions p "
+            "WHERE p.object_id = OBJECT_ID(QUOTENAME(c.TABLE_SCHEMA) + '.' + QUOTENAME(c.TABLE_NAME)) AND p.index_id IN (0, 1)) "
+            "FROM INFORMATION_SCHEMA.COLUMNS c "
+            "JOIN INFORMATION_SCHEMA.TABLES t ON t.TABLE_SCHEMA = c.TABLE_SCHEMA AND t.TABLE_NAME = c.TABLE_NAME "
+            "WHERE c.TABLE_SCHEMA = SCHEMA_NAME() AND t.TABLE_TYPE = 'BASE TABLE' "
+            "ORDER BY c.TABLE_NAME, c.ORDINAL_POSITION;"
+        )
+
+DIALECTS = {dialect.name: dialect() for dialect in (MySQLDialect, SQLServerDialect)}
+
+MYSQL = DIALECTS['mysql']
+
+# Function to look up a dialect by name
+def get_dialect(name):
+    if name not in DIALECTS:
+        raise ValueError(f"Unknown dialect '{name}'. Choose from: {', '.join(DIALECTS)}")
+    return DIALECTS[name]
+
+# Function to work out which dialect a connection speaks
+def dialect_for_connection(connection):
+    # Connections can name their dialect explicitly; otherwise pyodbc means SQL Server
+    name = getattr(connection, 'dialect', None)
+    if isinstance(name, Dialect):
+        return name
+    if name:
+        return get_dialect(name)
+    if type(connection).__module__.split('.')[0] == 'pyodbc':
+        return DIALECTS['sqlserver']
+    return MYSQL
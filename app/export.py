@@ -0,0 +1,137 @@
+# Import necessary libraries
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+import pandas as pd
+from connectdatabase import iter_query_batches, DEFAULT_FETCH_SIZE
+from convert import open_writer, detect_format
+from metrics import span, increment
+
+# Function to stream a query's result set as DataFrames of at most fetch_size rows
+def iter_query_chunks(connection, query, params=None, fetch_size=DEFAULT_FETCH_SIZE):
+    for columns, rows in iter_query_batches(connection, query, params, fetch_size):
+        yield pd.DataFrame.from_records(rows, columns=columns)
+
+# Function to find a table's single-column integer primary key, if it has one
+def get_integer_primary_key(connection, table_name):
+    cursor = connection.cursor()
+    try:
+        cursor.execute(
+            "SELECT k.COLUMN_NAME, c.DATA_TYPE FROM information_schema.KEY_COLUMN_USAGE k "
+            "JOIN information_schema.COLUMNS c ON c.TABLE_SCHEMA = k.TABLE_SCHEMA "
+            "AND c.TABLE_NAME = k.TABLE_NAME AND c.COLUMN_NAME = k.COLUMN_NAME "
+            "WHERE k.TABLE_SCHEMA = DATABASE() AND k.TABLE_NAME = %s AND k.CONSTRAINT_NAME = 'PRIMARY';",
+            (table_name,)
+        )
+        rows = cursor.fetchall()
+    finally:
+        cursor.close()
+
+    if len(rows) != 1:
+        return None
+    column_name, data_type = rows[0]
+    data_type = data_type.decode('utf-8') if isinstance(data_type, bytes) else data_type
+    column_name = column_name.decode('utf-8') if isinstance(column_name, bytes) else column_name
+    if data_type.lower() not in ('tinyint', 'smallint', 'mediumint', 'int', 'bigint'):
+        return None
+    return column_name
+
+# Function to split a table's primary key range into contiguous pieces
+def get_key_ranges(connection, table_name, key_column, parts):
+    cursor = connection.cursor()
+    try:
+        cursor.execute(f"SELECT MIN(`{key_column}`), MAX(`{key_column}`) FROM `{table_name}`;")
+        low, high = cursor.fetchone()
+    finally:
+        cursor.close()
+
+    if low is None:
+        return []
+
+    low, high = int(low), int(high)
+    step = max(1, -(-(high - low + 1) // parts))
+    # Each range is [start, end); the last one ends just past the maximum key
+    return [(start, min(start + step, high + 1)) for start in range(low, high + 1, step)]
+
+# Function run in a worker thread to spill one key range to part files on disk
+def fetch_range(pool, table_name, key_column, key_range, spill_dir, fetch_size):
+    query = (f"SELECT * FROM `{table_name}` WHERE `{key_column}` >= %s AND `{key_column}` < %s "
+             f"ORDER BY `{key_column}`;")
+    part_files = []
+    with pool.connection() as connection:
+        for index, df in enumerate(iter_query_chunks(connection, query, key_range, fetch_size)):
+            part_file = os.path.join(spill_dir, f"part-{index:06d}.pkl")
+            df.to_pickle(part_file)
+            part_files.append(part_file)
+    return part_files
+
+# Function to read a table with several connections at once, yielding chunks in key order
+def iter_table_chunks_parallel(pool, table_name, key_column, parallel, fetch_size=DEFAULT_FETCH_SIZE):
+    """Each worker streams one key range into temporary files while the caller consumes them in order."""
+    with pool.connection() as connection:
+        key_ranges = get_key_ranges(connection, table_name, key_column, parallel)
+
+    spill_root = tempfile.mkdtemp(prefix='centerspoke_export_')
+    try:
+        with ThreadPoolExecutor(max_workers=parallel) as executor:
+            futures = []
+            for index, key_range in enumerate(key_ranges):
+                spill_dir = os.path.join(spill_root, f"range-{index:04d}")
+                os.makedirs(spill_dir)
+                futures.append(executor.submit(fetch_range, pool, table_name, key_column, key_range, spill_dir, fetch_size))
+
+            # Ranges are handed on in order; later ranges keep downloading while earlier ones are written
+            for future in futures:
+                for part_file in future.result():
+                    yield pd.read_pickle(part_file)
+                    os.remove(part_file)
+    finally:
+        shutil.rmtree(spill_root, ignore_errors=True)
+
+# Function to export a table or query result to a CSV, Parquet, Excel or other supported file
+def export_data(pool, output_file, table_name=None, query=None, parallel=1, fetch_size=DEFAULT_FETCH_SIZE):
+    """Streams rows into output_file (format taken from its extension). Returns the row count.
+
+    With parallel > 1 and a table that has a single integer primary key, the read is split by
+    key range across that many pooled connections.
+    """
+    if not table_name and not query:
+        raise ValueError("Give a table name or a query to export")
+    detect_format(output_file)
+
+    if table_name and parallel > 1:
+        with pool.connection() as connection:
+            key_column = get_integer_primary_key(connection, table_name)
+        if key_column is None:
+            print(f"'{table_name}' has no single integer primary key; exporting with one connection.")
+            parallel = 1
+
+    start = time.perf_counter()
+    rows = 0
+    writer = open_writer(output_file)
+    try:
+        if table_name and parallel > 1:
+            for df in iter_table_chunks_parallel(pool, table_name, key_column, parallel, fetch_size):
+                with span('export.write'):
+                    writer.write(df)
+                rows += len(df)
+        else:
+            with pool.connection() as connection:
+                for df in iter_query_chunks(connection, query or f"SELECT * FROM `{table_name}`;", fetch_size=fetch_size):
+                    with span('export.write'):
+                        writer.write(df)
+                    rows += len(df)
+    except Exception:
+        # Do not leave a half-written export behind
+        writer.close()
+        if os.path.exists(output_file):
+            os.remove(output_file)
+        raise
+
+    writer.close()
+    increment('export.rows', rows)
+    elapsed = time.perf_counter() - start
+    print(f"Exported {rows} rows to {output_file} in {elapsed:.2f}s ({rows / elapsed if elapsed else 0:.0f} rows/s)")
+    return rows
@@ -0,0 +1,27 @@
+# Import necessary libraries
+import getpass
+from connectdatabase import get_connection_pool
+from dialects import MYSQL
+from uploadcommand import add_upload_arguments, check_upload_arguments, run_upload_session
+
+# Function to add the Google Cloud SQL options to the 'gcp' subcommand
+def add_arguments(gcp_db_parser):
+    gcp_db_parser.add_argument("--instance-connection-name", help="Google Cloud SQL instance connection name")
+    gcp_db_parser.add_argument("--database-name", help="Name of the database")
+    gcp_db_parser.add_argument("--username", help="Database username")
+    add_upload_arguments(gcp_db_parser, MYSQL.load_strategies)
+
+def run(args, parser):
+    # Google Cloud SQL database connection
+    instance_connection_name = args.instance_connection_name or input("Enter the Google Cloud SQL instance connection name: ")
+    database_name = args.database_name or input("Enter the name of the database: ")
+    username = args.username or input("Enter the database username: ")
+    password = getpass.getpass("Enter the database password: ")
+
+    check_upload_arguments(args, parser)
+
+    # Cloud SQL runs MySQL, so uploads can use LOAD DATA LOCAL INFILE like AWS RDS
+    allow_local_infile = args.load_strategy in ('auto', 'load-data')
+    pool = get_connection_pool('gcp', instance_connection_name, database_name, username, password,
+                               allow_local_infile=allow_local_infile, pool_size=args.pool_size)
+    run_upload_session(pool, args)
@@ -0,0 +1,67 @@
+# Import necessary libraries
+from connectdatabase import connect_to_google_cloud_storage
+from gcstransfer import (upload_paths, download_prefix, sync, DEFAULT_WORKERS, DEFAULT_CHUNK_SIZE,
+                         DEFAULT_PARALLEL_THRESHOLD)
+
+MEGABYTE = 1024 * 1024
+
+# Function to add the Google Cloud Storage options and actions to the 'gcp-storage' subcommand
+def add_arguments(gcp_storage_parser):
+    gcp_storage_parser.add_argument("--bucket-name", help="Google Cloud Storage bucket name")
+    gcp_storage_parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="Files (and parts of large files) transferred at the same time")
+    gcp_storage_parser.add_argument("--chunk-size-mb", type=int, default=DEFAULT_CHUNK_SIZE // MEGABYTE, help="Chunk size of resumable uploads in MB")
+    gcp_storage_parser.add_argument("--parallel-threshold-mb", type=int, default=DEFAULT_PARALLEL_THRESHOLD // MEGABYTE, help="Files at least this big are split into parts transferred in parallel")
+
+    # Add subparser for Google Cloud Storage actions
+    gcp_storage_subparsers = gcp_storage_parser.add_subparsers(dest='storage_action', help='Google Cloud Storage action to perform')
+
+    # Upload files or directories
+    upload_parser = gcp_storage_subparsers.add_parser('upload', help="Upload files or directories to the bucket")
+    upload_parser.add_argument("paths", nargs='+', help="Files or directories to upload")
+    upload_parser.add_argument("--prefix", default='', help="Object name prefix to upload under")
+
+    # Download objects
+    download_parser = gcp_storage_subparsers.add_parser('download', help="Download every object under a prefix")
+    download_parser.add_argument("--prefix", default='', help="Object name prefix to download")
+    download_parser.add_argument("--output-dir", default='.', help="Directory to download into")
+
+    # Sync a directory with a prefix
+    sync_parser = gcp_storage_subparsers.add_parser('sync', help="Transfer only the files that differ between a directory and a prefix")
+    sync_parser.add_argument("local_dir", help="Local directory")
+    sync_parser.add_argument("--prefix", default='', help="Object name prefix")
+    sync_parser.add_argument("--direction", choices=['up', 'down'], default='up', help="'up' copies the directory to the bucket, 'down' the bucket to the directory")
+    sync_parser.add_argument("--delete", action="store_true", help="Delete files that are missing from the source side")
+    sync_parser.add_argument("--dry-run", action="store_true", help="Only print what would be transferred or deleted")
+
+# Function to print how a batch of transfers went
+def print_transfer_summary(runner, skipped=(), deleted=()):
+    print(f"Transferred {len(runner.done)} file(s), skipped {len(skipped)} unchanged, deleted {len(deleted)}, {len(runner.failed)} failed.")
+    for label, error in runner.failed:
+        print(f"  {label}: {error}")
+
+def run(args, parser):
+    # Google Cloud Storage connection
+    bucket_name = args.bucket_name or input("Enter the Google Cloud Storage bucket name: ")
+    bucket = connect_to_google_cloud_storage(bucket_name)
+    if bucket is None or args.storage_action is None:
+        return
+
+    if args.chunk_size_mb <= 0 or args.parallel_threshold_mb <= 0:
+        parser.error("--chunk-size-mb and --parallel-threshold-mb must be positive")
+    transfer_options = {
+        'workers': args.workers,
+        'parallel_threshold': args.parallel_threshold_mb * MEGABYTE,
+    }
+
+    if args.storage_action == 'upload':
+        runner = upload_paths(bucket, args.paths, prefix=args.prefix, chunk_size=args.chunk_size_mb * MEGABYTE,
+                              **transfer_options)
+        print_transfer_summary(runner)
+    elif args.storage_action == 'download':
+        runner = download_prefix(bucket, args.prefix, args.output_dir, **transfer_options)
+        print_transfer_summary(runner)
+    elif args.storage_action == 'sync':
+        runner, skipped, deleted = sync(bucket, args.local_dir, prefix=args.prefix, direction=args.direction,
+                                        delete=args.delete, chunk_size=args.chunk_size_mb * MEGABYTE,
+                                        dry_run=args.dry_run, **transfer_options)
+        print_transfer_summary(runner, skipped, [] if args.dry_run else deleted)
@@ -0,0 +1,288 @@
+# Import necessary libraries
+import base64
+import hashlib
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from metrics import span, increment
+
+try:
+    import google_crc32c
+    HAVE_CRC32C = True
+except ImportError:
+    HAVE_CRC32C = False
+
+# Resumable uploads send the file in chunks of this size; GCS needs a multiple of 256 KB
+DEFAULT_CHUNK_SIZE = 8 * 1024 * 1024
+# Files and objects at least this big are split into parts transferred in parallel
+DEFAULT_PARALLEL_THRESHOLD = 64 * 1024 * 1024
+# Objects read from GCS while streaming an upload are fetched in ranges of this size
+DEFAULT_STREAM_CHUNK_SIZE = 8 * 1024 * 1024
+DEFAULT_WORKERS = 8
+# A compose request accepts at most 32 source objects
+MAX_COMPOSE_PARTS = 32
+READ_BLOCK_SIZE = 1024 * 1024
+
+# Function to check whether a path names a GCS object rather than a local file
+def is_gcs_uri(path):
+    return isinstance(path, str) and path.startswith('gs://')
+
+# Function to split 'gs://bucket/name' into the bucket and object names
+def parse_gcs_uri(uri):
+    bucket_name, _, object_name = uri[len('gs://'):].partition('/')
+    if not bucket_name or not object_name:
+        raise ValueError(f"Expected gs://bucket/object, got '{uri}'")
+    return bucket_name, object_name
+
+# Function to create a storage client, pointed at a local emulator when STORAGE_EMULATOR_HOST is set
+def get_storage_client():
+    from google.cloud import storage
+
+    if os.environ.get('STORAGE_EMULATOR_HOST'):
+        # The client library sends requests to the emulator by itself; it only needs credentials to skip the lookup
+        from google.auth.credentials import AnonymousCredentials
+        project = os.environ.get('GOOGLE_CLOUD_PROJECT', 'centerspoke-test')
+        return storage.Client(project=project, credentials=AnonymousCredentials())
+    return storage.Client()
+
+# Function to open a GCS object as a seekable file that is read in ranges on demand
+def open_gcs_object(uri, chunk_size=DEFAULT_STREAM_CHUNK_SIZE, client=None):
+    """Returns a read-only file object for a gs:// URI without downloading it to disk first."""
+    bucket_name, object_name = parse_gcs_uri(uri)
+    client = client or get_storage_client()
+    blob = client.bucket(bucket_name).blob(object_name)
+    return blob.open('rb', chunk_size=chunk_size)
+
+# Function to identify the contents of a GCS object without reading it
+def gcs_object_fingerprint(uri, client=None):
+    bucket_name, object_name = parse_gcs_uri(uri)
+    client = client or get_storage_client()
+    blob = client.bucket(bucket_name).get_blob(object_name)
+    if blob is None:
+        raise FileNotFoundError(f"No such object: '{uri}'")
+    # Checkpoints key uploads by a 40-character hex digest, the same length as hash_file_contents gives
+    return hashlib.sha1(f"{blob.crc32c or blob.md5_hash}:{blob.size}".encode('ascii')).hexdigest()
+
+# Function to compute the checksums GCS keeps for an object from a local file
+def local_checksums(file_path):
+    """Returns (crc32c, md5) base64 strings in the format of blob.crc32c and blob.md5_hash."""
+    md5 = hashlib.md5()
+    crc = google_crc32c.Checksum() if HAVE_CRC32C else None
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(READ_BLOCK_SIZE), b''):
+            md5.update(block)
+            if crc is not None:
+                crc.update(block)
+    crc32c = base64.b64encode(crc.digest()).decode('ascii') if crc is not None else None
+    return crc32c, base64.b64encode(md5.digest()).decode('ascii')
+
+# Function to decide whether a local file and a GCS object hold the same bytes
+def same_contents(file_path, blob):
+    if os.path.getsize(file_path) != blob.size:
+        return False
+    crc32c, md5 = local_checksums(file_path)
+    # Composite objects have no MD5, so CRC32C is preferred when both sides have it
+    if crc32c and blob.crc32c:
+        return crc32c == blob.crc32c
+    if blob.md5_hash:
+        return md5 == blob.md5_hash
+    return False
+
+# Function to split a byte count into contiguous (start, end) ranges, end exclusive
+def split_ranges(size, parts):
+    part_size = -(-size // parts)
+    return [(start, min(start + part_size, size)) for start in range(0, size, part_size)]
+
+# Function to upload one large file as parts in parallel and compose them into a single object
+def composite_upload(bucket, file_path, object_name, executor, parts=MAX_COMPOSE_PARTS):
+    size = os.path.getsize(file_path)
+    ranges = split_ranges(size, min(parts, MAX_COMPOSE_PARTS))
+    part_blobs = [bucket.blob(f"{object_name}.centerspoke-part-{i}") for i in range(len(ranges))]
+
+    def upload_part(part_blob, start, end):
+        with open(file_path, 'rb') as f:
+            f.seek(start)
+            part_blob.upload_from_file(f, size=end - start, checksum='crc32c')
+
+    try:
+        futures = [executor.submit(upload_part, part_blob, start, end) for part_blob, (start, end) in zip(part_blobs, ranges)]
+        for future in futures:
+            future.result()
+        blob = bucket.blob(object_name)
+        blob.compose(part_blobs)
+    finally:
+        for part_blob in part_blobs:
+            try:
+                part_blob.delete()
+            except Exception:
+                pass
+    return blob
+
+# Function to upload one file, in parallel parts when it is large
+def upload_file(bucket, file_path, object_name, executor, chunk_size=DEFAULT_CHUNK_SIZE,
+                parallel_threshold=DEFAULT_PARALLEL_THRESHOLD):
+    size = os.path.getsize(file_path)
+    with span('gcs.upload'):
+        if size >= parallel_threshold:
+            composite_upload(bucket, file_path, object_name, executor)
+        else:
+            # chunk_size makes the upload resumable, so a dropped connection only resends one chunk
+            blob = bucket.blob(object_name, chunk_size=chunk_size)
+            blob.upload_from_filename(file_path, checksum='crc32c')
+    increment('gcs.files_uploaded')
+    increment('gcs.bytes_uploaded', size)
+
+# Function to download one object, as parallel ranged reads when it is large
+def download_blob(blob, file_path, executor, parallel_threshold=DEFAULT_PARALLEL_THRESHOLD,
+                  parts=MAX_COMPOSE_PARTS):
+    os.makedirs(os.path.dirname(os.path.abspath(file_path)), exist_ok=True)
+    with span('gcs.download'):
+        if blob.size is not None and blob.size >= parallel_threshold:
+            with open(file_path, 'wb') as f:
+                f.truncate(blob.size)
+
+            def download_range(start, end):
+                # Pinning the generation stops the parts coming from different versions of the object
+                data = blob.download_as_bytes(start=start, end=end - 1, checksum=None,
+                                              if_generation_match=blob.generation)
+                with open(file_path, 'r+b') as f:
+                    f.seek(start)
+                    f.write(data)
+
+            futures = [executor.submit(download_range, start, end) for start, end in split_ranges(blob.size, parts)]
+            for future in futures:
+                future.result()
+        else:
+            blob.download_to_filename(file_path, checksum='crc32c')
+    increment('gcs.files_downloaded')
+    increment('gcs.bytes_downloaded', os.path.getsize(file_path))
+
+# Function to list the files under a local directory, keyed by their path relative to it
+def list_local_files(local_dir):
+    files = {}
+    for root, _, names in os.walk(local_dir):
+        for name in names:
+            path = os.path.join(root, name)
+            files[os.path.relpath(path, local_dir).replace(os.sep, '/')] = path
+    return files
+
+# Function to list the objects under a prefix, keyed by their name relative to it
+def list_remote_blobs(bucket, prefix=''):
+    prefix = prefix.strip('/')
+    base = prefix + '/' if prefix else ''
+    blobs = {}
+    for blob in bucket.list_blobs(prefix=base or None):
+        if not blob.name.endswith('/'):
+            blobs[blob.name[len(base):]] = blob
+    return blobs
+
+# Function to join a prefix and a relative name into an object name
+def object_name_for(prefix, relative_name):
+    prefix = prefix.strip('/')
+    return f"{prefix}/{relative_name}" if prefix else relative_name
+
+# Class to run transfers for many files on a shared set of threads
+class TransferRunner:
+    """Runs one transfer per file on a thread pool and collects what failed.
+
+    Large files are split into parts on a second pool, so a few big files cannot starve the
+    per-file workers and a transfer never waits on a part queued behind itself.
+    """
+
+    def __init__(self, workers=DEFAULT_WORKERS):
+        self.workers = workers
+        self.lock = threading.Lock()
+        self.done = []
+        self.failed = []
+
+    def run(self, tasks):
+        """tasks is a list of (label, function(part_executor)) pairs."""
+        with ThreadPoolExecutor(max_workers=self.workers) as part_executor, \
+                ThreadPoolExecutor(max_workers=self.workers) as file_executor:
+            futures = {file_executor.submit(task, part_executor): label for label, task in tasks}
+            for future, label in futures.items():
+                try:
+                    future.result()
+                    self.done.append(label)
+                except Exception as e:
+                    self.failed.append((label, e))
+                    print(f"Error transferring '{label}': {e}")
+        return self
+
+# Function to upload local files or directories to a bucket
+def upload_paths(bucket, paths, prefix='', workers=DEFAULT_WORKERS, chunk_size=DEFAULT_CHUNK_SIZE,
+                 parallel_threshold=DEFAULT_PARALLEL_THRESHOLD):
+    tasks = []
+    for path in paths:
+        if os.path.isdir(path):
+            files = list_local_files(path)
+        else:
+            files = {os.path.basename(path): path}
+        for relative_name, file_path in sorted(files.items()):
+            object_name = object_name_for(prefix, relative_name)
+            tasks.append((object_name, lambda executor, f=file_path, o=object_name:
+                          upload_file(bucket, f, o, executor, chunk_size, parallel_threshold)))
+    return TransferRunner(workers).run(tasks)
+
+# Function to download every object under a prefix to a local directory
+def download_prefix(bucket, prefix, local_dir, workers=DEFAULT_WORKERS, parallel_threshold=DEFAULT_PARALLEL_THRESHOLD):
+    tasks = []
+    for relative_name, blob in sorted(list_remote_blobs(bucket, prefix).items()):
+        file_path = os.path.join(local_dir, *relative_name.split('/'))
+        tasks.append((blob.name, lambda executor, b=blob, f=file_path:
+                      download_blob(b, f, executor, parallel_threshold)))
+    return TransferRunner(workers).run(tasks)
+
+# Function to make one side of a local directory and a bucket prefix match the other
+def sync(bucket, local_dir, prefix='', direction='up', delete=False, workers=DEFAULT_WORKERS,
+         chunk_size=DEFAULT_CHUNK_SIZE, parallel_threshold=DEFAULT_PARALLEL_THRESHOLD, dry_run=False):
+    """Transfers only files whose size or checksum differ; direction is 'up' or 'down'.
+
+    With delete=True, files missing from the source side are removed from the destination.
+    Returns (runner, skipped, deleted).
+    """
+    local_files = list_local_files(local_dir) if os.path.isdir(local_dir) else {}
+    remote_blobs = list_remote_blobs(bucket, prefix)
+
+    if direction == 'up':
+        sources, destinations = local_files, remote_blobs
+    else:
+        sources, destinations = remote_blobs, local_files
+
+    tasks = []
+    skipped = []
+    for relative_name in sorted(sources):
+        if relative_name in local_files and relative_name in remote_blobs:
+            with span('gcs.compare'):
+                unchanged = same_contents(local_files[relative_name], remote_blobs[relative_name])
+            if unchanged:
+                skipped.append(relative_name)
+                continue
+
+        if direction == 'up':
+            file_path, object_name = local_files[relative_name], object_name_for(prefix, relative_name)
+            task = (lambda executor, f=file_path, o=object_name:
+                    upload_file(bucket, f, o, executor, chunk_size, parallel_threshold))
+        else:
+            blob, file_path = remote_blobs[relative_name], os.path.join(local_dir, *relative_name.split('/'))
+            task = (lambda executor, b=blob, f=file_path:
+                    download_blob(b, f, executor, parallel_threshold))
+        tasks.append((relative_name, task))
+
+    increment('gcs.files_skipped', len(skipped))
+    deleted = sorted(set(destinations) - set(sources)) if delete else []
+
+    if dry_run:
+        for relative_name, _ in tasks:
+            print(f"Would transfer '{relative_name}'")
+        for relative_name in deleted:
+            print(f"Would delete '{relative_name}'")
+        return TransferRunner(workers), skipped, deleted
+
+    runner = TransferRunner(workers).run(tasks)
+    for relative_name in deleted:
+        if direction == 'up':
+            destinations[relative_name].delete()
+        else:
+            os.remove(destinations[relative_name])
+    return runner, skipped, deleted
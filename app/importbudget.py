@@ -0,0 +1,89 @@
+# Import necessary libraries
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+
+DRIVER_MODULES = ['mysql', 'pyodbc', 'google', 'boto3']
+DATA_MODULES = ['pandas', 'numpy', 'openpyxl']
+
+# Commands to time, with an import budget in milliseconds and the top-level packages each must not import.
+# Commands that only print help should stay well clear of pandas and the database drivers.
+CHECKS = [
+    (['--help'], 150, DATA_MODULES + DRIVER_MODULES),
+    (['convert', '--help'], 1000, DRIVER_MODULES),
+    (['aws', '--help'], 150, DATA_MODULES + ['pyodbc', 'google', 'boto3']),
+    (['azure', '--help'], 150, DATA_MODULES + ['mysql', 'google', 'boto3']),
+    (['gcp', '--help'], 150, DATA_MODULES + ['pyodbc', 'google', 'boto3']),
+    (['gcp-storage', '--help'], 150, DATA_MODULES + ['mysql', 'pyodbc', 'boto3']),
+    (['copy', '--help'], 150, DATA_MODULES + DRIVER_MODULES),
+]
+
+IMPORT_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)$")
+
+# Function to run main.py under -X importtime and collect what it imported
+def measure_imports(command_args, python=sys.executable):
+    """Returns (total_microseconds, {top-level module: cumulative microseconds}, set of all modules)."""
+    completed = subprocess.run([python, '-X', 'importtime', os.path.join(APP_DIR, 'main.py')] + command_args,
+                               cwd=APP_DIR, capture_output=True, text=True)
+    top_level = {}
+    modules = set()
+    for line in completed.stderr.splitlines():
+        match = IMPORT_LINE.match(line)
+        if not match:
+            continue
+        cumulative, indent, name = int(match.group(2)), match.group(3), match.group(4)
+        modules.add(name)
+        # Nested imports are indented under the module that triggered them
+        if not indent:
+            top_level[name] = top_level.get(name, 0) + cumulative
+    return sum(top_level.values()), top_level, modules
+
+# Function to time every check and report which ones exceed their budget
+def run_checks(scale=1.0, checks=CHECKS):
+    """scale multiplies every budget, e.g. 2 on a slow CI machine."""
+    results = []
+    for command_args, budget_ms, forbidden in checks:
+        total, top_level, modules = measure_imports(command_args)
+        loaded_forbidden = sorted({name.split('.')[0] for name in modules} & set(forbidden))
+        heaviest = sorted(top_level.items(), key=lambda item: item[1], reverse=True)[:5]
+        results.append({
+            'command': ' '.join(command_args),
+            'import_ms': round(total / 1000, 1),
+            'budget_ms': budget_ms * scale,
+            'heaviest': {name: round(micros / 1000, 1) for name, micros in heaviest},
+            'forbidden_imports': loaded_forbidden,
+            'over_budget': total / 1000 > budget_ms * scale,
+        })
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Check how long each Centerspoke command spends importing modules")
+    parser.add_argument("--scale", type=float, default=1.0, help="Multiply every command's import budget, e.g. 2 on a slow machine")
+    parser.add_argument("--json", dest="json_out", help="Also write the measurements to this JSON file")
+    args = parser.parse_args()
+
+    results = run_checks(args.scale)
+    failed = False
+    for result in results:
+        status = 'OK'
+        if result['over_budget'] or result['forbidden_imports']:
+            status = 'FAIL'
+            failed = True
+        heaviest = ', '.join([f"{name} {ms:.0f}ms" for name, ms in result['heaviest'].items()])
+        print(f"[{status}] main.py {result['command']:<22} {result['import_ms']:8.1f}ms of {result['budget_ms']:.0f}ms  ({heaviest})")
+        if result['forbidden_imports']:
+            print(f"       imports {', '.join(result['forbidden_imports'])}, which this command should not need")
+
+    if args.json_out:
+        with open(args.json_out, 'w', encoding='utf-8') as handle:
+            json.dump({'scale': args.scale, 'results': results}, handle, indent=2)
+
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+# Import necessary libraries
+import json
+import os
+import sqlite3
+from checkpoint import DEFAULT_STATE_PATH, describe_target
+from dialects import dialect_for_connection
+from metrics import span
+
+# Local record of indexes dropped for a load, so an interrupted load can put them back
+class DeferredIndexStore:
+    """Keeps the definition of every index deferred for a load in the local state database.
+
+    A definition is written before its index is dropped and removed once the index is rebuilt,
+    so if the process dies in between, the next load of the same table rebuilds it first.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or os.environ.get("CENTERSPOKE_STATE_DB", DEFAULT_STATE_PATH)
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self.db = sqlite3.connect(self.path)
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS deferred_indexes ("
+            "target TEXT NOT NULL, index_name TEXT NOT NULL, columns TEXT NOT NULL, "
+            "PRIMARY KEY (target, index_name))"
+        )
+        self.db.commit()
+
+    def load(self, target):
+        rows = self.db.execute("SELECT index_name, columns FROM deferred_indexes WHERE target = ? ORDER BY index_name",
+                               (target,)).fetchall()
+        return {index_name: json.loads(columns) for index_name, columns in rows}
+
+    def record(self, target, index_name, columns):
+        self.db.execute("INSERT OR REPLACE INTO deferred_indexes (target, index_name, columns) VALUES (?, ?, ?)",
+                        (target, index_name, json.dumps(columns)))
+        self.db.commit()
+
+    def forget(self, target, index_names):
+        self.db.executemany("DELETE FROM deferred_indexes WHERE target = ? AND index_name = ?",
+                            [(target, index_name) for index_name in index_names])
+        self.db.commit()
+
+    def close(self):
+        self.db.close()
+
+# Function to run one statement on its own cursor
+def execute(connection, statement, params=None):
+    cursor = connection.cursor()
+    try:
+        if params:
+            cursor.execute(statement, params)
+        else:
+            cursor.execute(statement)
+        return cursor.fetchall() if cursor.description else None
+    finally:
+        cursor.close()
+
+# Function to switch off per-row checks for the current session
+def set_load_session(connection, dialect=None):
+    """Applies the dialect's load session settings and returns the previous values for restore_session."""
+    dialect = dialect or dialect_for_connection(connection)
+    if not dialect.load_session_settings:
+        return {}
+    previous = dict(zip(dialect.load_session_settings, execute(connection, dialect.session_settings_query())[0]))
+    execute(connection, dialect.set_session_sql(dialect.load_session_settings))
+    return previous
+
+# Function to put session settings back, e.g. before a pooled connection is handed to someone else
+def restore_session(connection, previous, dialect=None):
+    if previous:
+        dialect = dialect or dialect_for_connection(connection)
+        execute(connection, dialect.set_session_sql(previous))
+
+# Function to list a table's secondary indexes that can be dropped and rebuilt around a load
+def list_deferrable_indexes(connection, table_name, dialect):
+    query = dialect.deferrable_indexes_query(table_name)
+    if query is None:
+        return {}
+    indexes = {}
+    for index_name, column in execute(connection, *query):
+        index_name = index_name.decode('utf-8') if isinstance(index_name, bytes) else index_name
+        column = column.decode('utf-8') if isinstance(column, bytes) else column
+        indexes.setdefault(index_name, [])
+        if column is not None:
+            indexes[index_name].append(column)
+    return indexes
+
+# Bulk load setup that defers index maintenance and per-row checks until the rows are in
+class LoadOptimizer:
+    """Prepares a table and session for a bulk load and undoes it all afterwards.
+
+    start() turns off unique and foreign key checks for the session (MySQL) and drops (MySQL)
+    or disables (SQL Server) the table's non-unique secondary indexes. finish() rebuilds the
+    indexes in one pass and restores the session, whether or not the load succeeded; uncommitted
+    rows of a failed load are rolled back first. Unique checks are only skipped, not
+    removed: the data must not contain duplicates of a unique key.
+    """
+
+    def __init__(self, connection, table_name, defer_indexes=True, tune_session=True, store=None):
+        """tune_session=False leaves the session alone, for when other connections do the inserts."""
+        self.connection = connection
+        self.table_name = table_name
+        self.defer_indexes = defer_indexes
+        self.tune_session = tune_session
+        self.dialect = dialect_for_connection(connection)
+        self.target = describe_target(connection, table_name)
+        self.store = store
+        self.previous_settings = {}
+        self.started = False
+
+    def start(self):
+        # Set first, so finish() undoes whatever part of the setup happened before a failure
+        self.started = True
+        if self.defer_indexes:
+            self.store = self.store or DeferredIndexStore()
+            if self.store.load(self.target):
+                print(f"Rebuilding indexes on '{self.table_name}' left deferred by an interrupted load")
+                self.rebuild_indexes()
+
+            for index_name, columns in list_deferrable_indexes(self.connection, self.table_name, self.dialect).items():
+                # Recorded first, so a crash right after the drop still leaves its definition behind
+                self.store.record(self.target, index_name, columns)
+                try:
+                    execute(self.connection, self.dialect.defer_index_sql(self.table_name, index_name))
+                except Exception as e:
+                    # e.g. an index a foreign key depends on; it is simply maintained during the load
+                    self.store.forget(self.target, [index_name])
+                    print(f"Keeping index '{index_name}' during the load: {e}")
+            deferred = self.store.load(self.target)
+            if deferred:
+                print(f"Deferred {len(deferred)} index(es) on '{self.table_name}' until the load finishes")
+
+        if self.tune_session:
+            self.previous_settings = set_load_session(self.connection, self.dialect)
+        return self
+
+    def rebuild_indexes(self):
+        deferred = self.store.load(self.target)
+        # Indexes that exist (and are enabled) again after an earlier attempt are left alone
+        present = list_deferrable_indexes(self.connection, self.table_name, self.dialect)
+        missing = {name: columns for name, columns in deferred.items() if name not in present}
+        if missing:
+            with span('db.rebuild_indexes'):
+                for statement in self.dialect.restore_indexes_sql(self.table_name, missing):
+                    execute(self.connection, statement)
+            print(f"Rebuilt {len(missing)} index(es) on '{self.table_name}'")
+        self.store.forget(self.target, list(deferred))
+
+    def finish(self):
+        """Rebuilds deferred indexes and restores the session; raises if the indexes could not be rebuilt."""
+        if not self.started:
+            return
+        self.started = False
+        # Whatever is still uncommitted belongs to a failed load; MySQL would commit it along with the DDL
+        self.connection.rollback()
+        try:
+            if self.store is not None:
+                try:
+                    self.rebuild_indexes()
+                except Exception as e:
+                    raise RuntimeError(f"Could not rebuild the indexes on '{self.table_name}' ({e}); "
+                                       "they are rebuilt at the start of the next load-optimized upload to it") from e
+        finally:
+            restore_session(self.connection, self.previous_settings, self.dialect)
+            if self.store is not None:
+                self.store.close()
+                self.store = None
@@ -0,0 +1,154 @@
+# Import necessary libraries
+import json
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+
+# Collector for stage timings and counters within one run
+class Metrics:
+    """Accumulates timing spans and counters from every thread of the process.
+
+    A span records how often a named stage ran and the wall time spent in it; counters hold
+    totals such as rows processed or bytes read. Names are dotted, e.g. 'upload.insert'.
+    Work done in worker processes is not collected.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.started_at = time.time()
+        self.spans = {}  # name -> [calls, seconds]
+        self.counters = {}
+
+    def add_time(self, name, seconds, calls=1):
+        with self.lock:
+            span = self.spans.setdefault(name, [0, 0.0])
+            span[0] += calls
+            span[1] += seconds
+
+    @contextmanager
+    def span(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(name, time.perf_counter() - start)
+
+    def increment(self, name, amount=1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def timed_iter(self, iterable, name):
+        """Yields from iterable, counting the time spent producing each item towards span name."""
+        iterator = iter(iterable)
+        while True:
+            start = time.perf_counter()
+            item = next(iterator, StopIteration)
+            if item is StopIteration:
+                return
+            self.add_time(name, time.perf_counter() - start)
+            yield item
+
+    def reset(self):
+        with self.lock:
+            self.started_at = time.time()
+            self.spans = {}
+            self.counters = {}
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                'started_at': self.started_at,
+                'elapsed_seconds': round(time.time() - self.started_at, 6),
+                'spans': {name: {'calls': calls, 'seconds': round(seconds, 6)}
+                          for name, (calls, seconds) in sorted(self.spans.items())},
+                'counters': dict(sorted(self.counters.items())),
+            }
+
+    def summary(self):
+        data = self.snapshot()
+        lines = [f"Run time: {data['elapsed_seconds']:.2f}s"]
+        if data['spans']:
+            lines.append("Stage                            calls      seconds")
+            for name, span in data['spans'].items():
+                lines.append(f"  {name:<30} {span['calls']:>6} {span['seconds']:>12.3f}")
+        if data['counters']:
+            lines.append("Counter                                     total")
+            for name, value in data['counters'].items():
+                lines.append(f"  {name:<30} {value:>18,}")
+        return '\n'.join(lines)
+
+    def to_prometheus(self):
+        # Every run writes a fresh file, so values describe the last run and are gauges, not counters
+        data = self.snapshot()
+        lines = [
+            "# HELP centerspoke_stage_seconds Wall time spent in each stage during the last run.",
+            "# TYPE centerspoke_stage_seconds gauge",
+        ]
+        for name, span in data['spans'].items():
+            lines.append(f'centerspoke_stage_seconds{{stage="{name}"}} {span["seconds"]}')
+        lines += [
+            "# HELP centerspoke_stage_calls Number of times each stage ran during the last run.",
+            "# TYPE centerspoke_stage_calls gauge",
+        ]
+        for name, span in data['spans'].items():
+            lines.append(f'centerspoke_stage_calls{{stage="{name}"}} {span["calls"]}')
+        for name, value in data['counters'].items():
+            metric = 'centerspoke_' + re.sub(r'[^a-zA-Z0-9_]', '_', name)
+            lines.append(f"# TYPE {metric} gauge")
+            lines.append(f"{metric} {value}")
+        lines += [
+            "# HELP centerspoke_last_run_timestamp_seconds When the last run started.",
+            "# TYPE centerspoke_last_run_timestamp_seconds gauge",
+            f"centerspoke_last_run_timestamp_seconds {data['started_at']:.0f}",
+            "# TYPE centerspoke_last_run_duration_seconds gauge",
+            f"centerspoke_last_run_duration_seconds {data['elapsed_seconds']}",
+        ]
+        return '\n'.join(lines) + '\n'
+
+    def write(self, output_file):
+        """Writes a Prometheus textfile for .prom paths and JSON otherwise."""
+        content = self.to_prometheus() if output_file.endswith('.prom') else json.dumps(self.snapshot(), indent=2)
+        # Write then rename, so a collector never reads a half-written file
+        temp_file = f"{output_file}.{os.getpid()}.tmp"
+        with open(temp_file, 'w', encoding='utf-8') as handle:
+            handle.write(content)
+        os.replace(temp_file, output_file)
+
+# The process-wide collector that the module-level helpers record into
+METRICS = Metrics()
+
+def span(name):
+    return METRICS.span(name)
+
+def add_time(name, seconds, calls=1):
+    METRICS.add_time(name, seconds, calls)
+
+def increment(name, amount=1):
+    METRICS.increment(name, amount)
+
+def timed_iter(iterable, name):
+    return METRICS.timed_iter(iterable, name)
+
+# Function to run a block under cProfile and save the statistics
+@contextmanager
+def profiled(output_file, top=15):
+    """Dumps cProfile stats to output_file (readable with pstats or snakeviz) and prints the top entries."""
+    # Imported here so runs without --profile do not pay for loading the profiler
+    import cProfile
+    import io
+    import pstats
+
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield profiler
+    finally:
+        profiler.disable()
+        profiler.dump_stats(output_file)
+
+        report = io.StringIO()
+        pstats.Stats(profiler, stream=report).sort_stats('cumulative').print_stats(top)
+        print(f"Profile written to {output_file}; top {top} functions by cumulative time:")
+        print(report.getvalue())
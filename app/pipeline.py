@@ -0,0 +1,212 @@
+# Import necessary libraries
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from bulkload import create_bulk_loader
+from loadmode import LoadOptimizer, set_load_session, restore_session
+from metrics import add_time, increment
+
+DEFAULT_PIPELINE_CHUNK_ROWS = 20000
+
+# Marks the end of a stage's output
+_DONE = object()
+
+# Producer/consumer upload with separate read, convert and insert stages
+class UploadPipeline:
+    """Runs reading, conversion and insertion in their own threads, joined by bounded queues.
+
+    Each queue holds at most queue_size chunks, so a slow stage makes the faster ones wait
+    instead of letting parsed data pile up in memory. Inserts go out over insert_workers pooled
+    connections, and every connection commits only once all of them have finished without error.
+    """
+
+    def __init__(self, pool, table_name, insert_workers=2, queue_size=2, load_options=None, tune_sessions=False):
+        self.pool = pool
+        self.tune_sessions = tune_sessions
+        self.table_name = table_name
+        self.insert_workers = max(1, insert_workers)
+        self.load_options = load_options or {}
+        self.parsed = queue.Queue(maxsize=queue_size)
+        self.converted = queue.Queue(maxsize=queue_size * self.insert_workers)
+        self.stop = threading.Event()
+        self.errors = []
+        self.stage_seconds = {'read': 0.0, 'convert': 0.0, 'insert': 0.0}
+        self.rows_inserted = 0
+        self.lock = threading.Lock()
+
+    def fail(self, error):
+        with self.lock:
+            self.errors.append(error)
+        self.stop.set()
+
+    def add_time(self, stage, seconds):
+        with self.lock:
+            self.stage_seconds[stage] += seconds
+        add_time(f'pipeline.{stage}', seconds)
+
+    def put(self, target_queue, item):
+        # Block while the next stage is behind, but give up as soon as any stage has failed
+        while not self.stop.is_set():
+            try:
+                target_queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def get(self, source_queue):
+        while not self.stop.is_set():
+            try:
+                return source_queue.get(timeout=0.1)
+            except queue.Empty:
+                continue
+        return _DONE
+
+    def read_stage(self, chunks):
+        try:
+            iterator = iter(chunks)
+            while True:
+                start = time.perf_counter()
+                df = next(iterator, _DONE)
+                self.add_time('read', time.perf_counter() - start)
+                if df is _DONE or not self.put(self.parsed, df):
+                    break
+        except Exception as e:
+            self.fail(e)
+        finally:
+            self.put(self.parsed, _DONE)
+
+    def convert_stage(self):
+        # Imported here so subclasses that convert rows themselves (copydata) do not load pandas
+        from uploaddata import prepare_records
+
+        try:
+            while True:
+                df = self.get(self.parsed)
+                if df is _DONE:
+                    break
+
+                start = time.perf_counter()
+                # Remove rows where all elements are NaN (blank lines)
+                df = df.dropna(how='all')
+                if df.empty:
+                    continue
+                records = prepare_records(df)
+                self.add_time('convert', time.perf_counter() - start)
+
+                if not self.put(self.converted, (list(df.columns), records)):
+                    break
+        except Exception as e:
+            self.fail(e)
+        finally:
+            for _ in range(self.insert_workers):
+                self.put(self.converted, _DONE)
+
+    def insert_stage(self, connection):
+        loader = None
+        rows = 0
+        try:
+            while True:
+                item = self.get(self.converted)
+                if item is _DONE:
+                    break
+
+                columns, records = item
+                start = time.perf_counter()
+                if loader is None:
+                    loader = create_bulk_loader(connection, self.table_name, columns, **self.load_options)
+                rows += loader.load(records)
+                increment('upload.rows', len(records))
+                with self.lock:
+                    self.rows_inserted += len(records)
+                self.add_time('insert', time.perf_counter() - start)
+        except Exception as e:
+            self.fail(e)
+        return loader, rows
+
+    def run(self, chunks):
+        """Uploads every chunk and returns the number of rows inserted; raises the first stage error."""
+        connections = [self.pool.acquire() for _ in range(self.insert_workers)]
+        session_settings = []
+        results = []
+        try:
+            if self.tune_sessions:
+                session_settings = [set_load_session(connection) for connection in connections]
+
+            with ThreadPoolExecutor(max_workers=self.insert_workers + 2) as executor:
+                executor.submit(self.read_stage, chunks)
+                executor.submit(self.convert_stage)
+                inserts = [executor.submit(self.insert_stage, connection) for connection in connections]
+                results = [future.result() for future in inserts]
+
+            for loader, _ in results:
+                if loader is None:
+                    continue
+                if self.errors:
+                    loader.close()
+                else:
+                    loader.finish()
+
+        finally:
+            for connection, previous in zip(connections, session_settings):
+                try:
+                    restore_session(connection, previous)
+                except Exception as e:
+                    self.fail(e)
+            for connection in connections:
+                # Release rolls back anything left uncommitted after a failure
+                self.pool.release(connection)
+
+        if self.errors:
+            raise self.errors[0]
+        return sum(rows for _, rows in results)
+
+# Function to upload an Excel sheet with reading, conversion and inserts running concurrently
+def pipeline_upload_excel_data(pool, table_name, excel_file_path, sheet_name, chunk_rows=None, insert_workers=2,
+                               queue_size=2, load_strategy='auto', batch_size=None, commit_every=None,
+                               chunks=None, use_cache=True, optimize_load=False):
+    from uploaddata import read_sheet_chunks, split_chunks, check_sheet_against_table, rename_chunks
+
+    chunk_rows = chunk_rows or DEFAULT_PIPELINE_CHUNK_ROWS
+    optimizer = None
+    control_connection = None
+    try:
+        if chunks is None:
+            # A sheet that does not fit the table fails here, before any of its rows are parsed
+            with pool.connection() as connection:
+                column_mapping = check_sheet_against_table(connection, table_name, excel_file_path, sheet_name)
+            chunks = read_sheet_chunks(excel_file_path, sheet_name, chunk_rows, use_cache)
+            if column_mapping:
+                chunks = rename_chunks(chunks, column_mapping)
+        # Data handed over in one piece is split so the stages have something to overlap
+        chunks = split_chunks(chunks, chunk_rows)
+
+        if optimize_load:
+            # Indexes are deferred over a connection of their own; each insert worker tunes its own session
+            control_connection = pool.acquire()
+            optimizer = LoadOptimizer(control_connection, table_name, tune_session=False).start()
+            commit_every = None
+
+        load_options = {'strategy': load_strategy, 'batch_size': batch_size, 'commit_every': commit_every}
+        pipeline = UploadPipeline(pool, table_name, insert_workers=insert_workers, queue_size=queue_size,
+                                  load_options=load_options, tune_sessions=optimize_load)
+
+        start = time.perf_counter()
+        total_rows = pipeline.run(chunks)
+        elapsed = time.perf_counter() - start
+
+        stages = ', '.join([f"{stage} {seconds:.2f}s" for stage, seconds in pipeline.stage_seconds.items()])
+        print(f"Data uploaded successfully to '{table_name}' ({total_rows} rows in {elapsed:.2f}s; busy time: {stages}).")
+
+    except Exception as e:
+        print(f"Error uploading data: {e}")
+
+    finally:
+        if optimizer:
+            try:
+                optimizer.finish()
+            except Exception as e:
+                print(f"Error restoring '{table_name}' after the load: {e}")
+        if control_connection is not None:
+            pool.release(control_connection)
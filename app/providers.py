@@ -0,0 +1,59 @@
+# Import necessary libraries
+import argparse
+import importlib
+import os
+
+# Registered commands: name -> (help text, module implementing it)
+PROVIDERS = {}
+
+# Function to register a command implemented in its own module
+def register_provider(name, help_text, module_name):
+    """Registers a subcommand.
+
+    module_name must define add_arguments(parser) and run(args, parser). The module is only
+    imported when its subcommand is on the command line, so registering a provider costs
+    nothing for the others.
+    """
+    PROVIDERS[name] = (help_text, module_name)
+
+# Function to import the module behind a registered command
+def load_provider(name):
+    return importlib.import_module(PROVIDERS[name][1])
+
+# Subcommand parser that asks its module for its arguments only when it is actually used
+class ProviderParser(argparse.ArgumentParser):
+    def __init__(self, *args, provider=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.provider = provider
+
+    def configure(self):
+        if self.provider is not None:
+            provider, self.provider = self.provider, None
+            load_provider(provider).add_arguments(self)
+
+    def parse_known_args(self, args=None, namespace=None):
+        self.configure()
+        return super().parse_known_args(args, namespace)
+
+    def format_help(self):
+        self.configure()
+        return super().format_help()
+
+# Function to add a subparser for every registered command
+def add_provider_parsers(subparsers):
+    for name, (help_text, _) in PROVIDERS.items():
+        subparsers.add_parser(name, help=help_text, provider=name)
+
+register_provider('convert', "Convert between CSV, text, JSON, XML, Excel and Parquet", 'convert')
+register_provider('aws', "Connect to AWS RDS Database", 'awsprovider')
+register_provider('azure', "Connect to Azure SQL Database", 'azureprovider')
+register_provider('gcp', "Connect to Google Cloud SQL Database", 'gcpprovider')
+register_provider('gcp-storage', "Connect to Google Cloud Storage", 'gcpstorageprovider')
+register_provider('copy', "Copy a table from one database to another", 'copydata')
+
+# Extra providers can be plugged in without editing this file, e.g.
+# CENTERSPOKE_PROVIDERS="snowflake=snowflakeprovider:Connect to Snowflake"
+for entry in filter(None, os.environ.get("CENTERSPOKE_PROVIDERS", "").split(',')):
+    name, _, target = entry.partition('=')
+    module_name, _, help_text = target.partition(':')
+    register_provider(name.strip(), help_text.strip() or f"Connect to {name.strip()}", module_name.strip())
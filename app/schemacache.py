@@ -0,0 +1,178 @@
+# Import necessary libraries
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from dialects import dialect_for_connection
+from metrics import span, increment
+
+DEFAULT_SCHEMA_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "centerspoke", "schema")
+DEFAULT_SCHEMA_TTL_SECONDS = 300
+
+# Function to name the database a connection points at, for keying local state
+def describe_database(connection):
+    if hasattr(connection, 'getinfo'):
+        # pyodbc connections (Azure SQL) report their server and database through ODBC
+        import pyodbc
+        return f"{connection.getinfo(pyodbc.SQL_SERVER_NAME)}:/{connection.getinfo(pyodbc.SQL_DATABASE_NAME)}"
+    host = getattr(connection, 'server_host', '') or ''
+    port = getattr(connection, 'server_port', '') or ''
+    database = getattr(connection, 'database', '') or ''
+    return f"{host}:{port}/{database}"
+
+# Local copy of the tables and columns of each database Centerspoke talks to
+class SchemaCache:
+    """Caches table and column metadata per database, in memory and in a JSON file per target.
+
+    All of it is fetched from information_schema in one query and reused for ttl seconds, so an
+    interactive session does not go back to the server every time it lists tables or checks a
+    sheet. Anything that creates or alters a table must call invalidate().
+    """
+
+    def __init__(self, cache_dir=None, ttl=None):
+        self.cache_dir = cache_dir or os.environ.get("CENTERSPOKE_SCHEMA_CACHE_DIR", DEFAULT_SCHEMA_CACHE_DIR)
+        self.ttl = ttl if ttl is not None else float(os.environ.get("CENTERSPOKE_SCHEMA_TTL", DEFAULT_SCHEMA_TTL_SECONDS))
+        self.lock = threading.Lock()
+        self.entries = {}  # target -> (fetched_at, tables)
+
+    def path_for(self, target):
+        return os.path.join(self.cache_dir, hashlib.sha1(target.encode('utf-8')).hexdigest() + '.json')
+
+    def fetch(self, connection):
+        """Reads the metadata of every table in one round trip."""
+        tables = {}
+        cursor = connection.cursor()
+        try:
+            with span('db.schema_metadata'):
+                cursor.execute(dialect_for_connection(connection).schema_metadata_sql())
+                rows = cursor.fetchall()
+        finally:
+            cursor.close()
+
+        for table_name, column_name, data_type, nullable, default, generated, row_estimate in rows:
+            # mysql.connector may return information_schema text as bytes
+            table_name, column_name, data_type = [value.decode('utf-8') if isinstance(value, bytes) else value
+                                                  for value in (table_name, column_name, data_type)]
+            table = tables.setdefault(table_name, {'columns': [], 'rows': None})
+            table['rows'] = int(row_estimate) if row_estimate is not None else None
+            table['columns'].append({
+                'name': column_name,
+                'type': data_type,
+                'nullable': nullable in ('YES', b'YES'),
+                'has_default': default is not None or bool(generated),
+            })
+        return tables
+
+    def read_file(self, target):
+        try:
+            with open(self.path_for(target)) as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if entry.get('target') != target:
+            return None
+        return entry['fetched_at'], entry['tables']
+
+    def write_file(self, target, fetched_at, tables):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump({'target': target, 'fetched_at': fetched_at, 'tables': tables}, f)
+            os.replace(temp_path, self.path_for(target))
+        except OSError:
+            # The cache only saves round trips; failing to write it is not an error
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+    def tables(self, connection, refresh=False):
+        """Returns {table name: {'columns': [...], 'rows': estimate}} for the connection's database."""
+        target = describe_database(connection)
+        with self.lock:
+            entry = None if refresh else self.entries.get(target) or self.read_file(target)
+            if entry and time.time() - entry[0] < self.ttl:
+                self.entries[target] = entry
+                increment('schema_cache.hits')
+                return entry[1]
+
+            increment('schema_cache.misses')
+            fetched_at, tables = time.time(), self.fetch(connection)
+            self.entries[target] = (fetched_at, tables)
+            self.write_file(target, fetched_at, tables)
+            return tables
+
+    def table(self, connection, table_name, refresh=False):
+        """Returns the metadata of one table, or None if it does not exist."""
+        return self.tables(connection, refresh).get(table_name)
+
+    def invalidate(self, connection):
+        target = describe_database(connection)
+        with self.lock:
+            self.entries.pop(target, None)
+            try:
+                os.remove(self.path_for(target))
+            except OSError:
+                pass
+
+SCHEMA_CACHE = SchemaCache()
+
+# Function to reduce a column name to the form headers and table columns are compared in
+def fold_column_name(name):
+    return name.strip().lower().replace(' ', '_')
+
+# Function to map sheet headers onto the columns of an existing table
+def match_columns(sheet_columns, table_columns):
+    """Returns {sheet column: table column}, or raises ValueError describing every mismatch.
+
+    Headers match table columns exactly, or else ignoring case, surrounding spaces and spaces
+    that a created table has turned into underscores. Table columns the sheet does not have are
+    fine only if they are nullable or have a default.
+    """
+    by_name = {column['name']: column for column in table_columns}
+    by_folded = {}
+    for column in table_columns:
+        by_folded.setdefault(fold_column_name(column['name']), []).append(column)
+
+    mapping = {}
+    unknown = []
+    for header in sheet_columns:
+        name = str(header)
+        if name in by_name:
+            mapping[header] = name
+            continue
+        candidates = by_folded.get(fold_column_name(name), [])
+        if len(candidates) == 1:
+            mapping[header] = candidates[0]['name']
+        else:
+            unknown.append(name)
+
+    duplicates = sorted({name for name in mapping.values() if list(mapping.values()).count(name) > 1})
+    used = set(mapping.values())
+    missing = [column['name'] for column in table_columns
+               if column['name'] not in used and not column['nullable'] and not column['has_default']]
+
+    problems = []
+    if unknown:
+        problems.append(f"sheet columns not in the table: {', '.join(unknown)}")
+    if duplicates:
+        problems.append(f"several sheet columns map to: {', '.join(duplicates)}")
+    if missing:
+        problems.append(f"required table columns missing from the sheet: {', '.join(missing)}")
+    if problems:
+        raise ValueError('; '.join(problems))
+    return mapping
+
+# Function to check a sheet's headers against a table before any data is read
+def check_columns_against_table(connection, table_name, sheet_columns, cache=SCHEMA_CACHE):
+    """Returns the header-to-column mapping; a stale cache entry is refreshed once before failing."""
+    for refresh in (False, True):
+        table = cache.table(connection, table_name, refresh=refresh)
+        try:
+            if table is None:
+                raise ValueError(f"table '{table_name}' does not exist")
+            return match_columns(sheet_columns, table['columns'])
+        except ValueError:
+            if refresh:
+                raise
@@ -0,0 +1,82 @@
+# Import necessary libraries
+from connectdatabase import close_all_pools
+from createtable import list_tables
+
+# Function to add the Excel upload options shared by the database providers
+def add_upload_arguments(parser, load_strategies, checkpoints=True):
+    """Adds the upload options; checkpoints adds --resume/--incremental/--key, which need MySQL."""
+    parser.add_argument("--pool-size", type=int, default=4, help="Maximum number of pooled database connections")
+    parser.add_argument("--chunk-rows", type=int, help="Stream Excel uploads in chunks of this many rows to keep memory flat")
+    parser.add_argument("--no-cache", action="store_true", help="Parse Excel files from scratch instead of using the parsed-workbook cache")
+    parser.add_argument("--sample-rows", type=int, help="Infer new table column types from only the first N rows")
+    if checkpoints:
+        parser.add_argument("--resume", action="store_true", help="Commit uploads chunk by chunk with a checkpoint so a rerun continues where a failed one stopped")
+        parser.add_argument("--restart", action="store_true", help="Discard any checkpoint and row history and upload from the first row")
+        parser.add_argument("--incremental", action="store_true", help="Only send rows that are new or changed since the last upload to the table")
+        parser.add_argument("--key", help="Comma-separated unique key columns; implies --incremental and upserts changed rows")
+    parser.add_argument("--load-strategy", choices=['auto'] + list(load_strategies), default='auto', help="How rows are written to the table (auto picks the fastest one the server allows)")
+    parser.add_argument("--batch-size", type=int, help="Rows sent per insert statement")
+    parser.add_argument("--commit-every", type=int, help="Commit after this many rows instead of once at the end")
+    parser.add_argument("--optimize-load", action="store_true", help="Drop secondary indexes and per-row checks during the upload and rebuild them after it, loading in one transaction")
+    parser.add_argument("--pipeline", action="store_true", help="Read, convert and insert concurrently in separate threads")
+    parser.add_argument("--insert-workers", type=int, default=2, help="Connections inserting in parallel with --pipeline")
+    parser.add_argument("--queue-size", type=int, default=2, help="Chunks buffered between pipeline stages with --pipeline")
+
+# Function to check option combinations before connecting
+def check_upload_arguments(args, parser):
+    checkpointed = getattr(args, 'resume', False) or getattr(args, 'incremental', False) or getattr(args, 'key', None)
+    if args.pipeline and checkpointed:
+        parser.error("--pipeline cannot be combined with --resume, --incremental or --key")
+
+# Function to list the tables and walk the user through uploading an Excel sheet
+def run_upload_session(pool, args):
+    # Imported here so '--help' does not load pandas
+    from uploaddata import upload_excel_data, auto_create_table_from_excel
+    from pipeline import pipeline_upload_excel_data
+
+    try:
+        with pool.connection() as connection:
+            existing_tables = list_tables(connection)
+    except ConnectionError as e:
+        print(f"An error occurred: {e}")
+        return
+
+    print("Existing tables:", existing_tables)
+
+    upload_data_response = input("Would you like to upload data from an excel file? (y/n): ").lower()
+
+    if upload_data_response == 'y':
+        excel_file_path = input("Enter the path to the excel file: ")
+        sheet_name = input("Enter the name of the sheet to upload: ")
+
+        create_table_response = input("Would you like to create a new table? (y/n): ").lower()
+
+        with pool.connection() as connection:
+            parsed_chunks = None
+            if create_table_response == 'y':
+                table_name = input("Enter the name of the new table: ")
+                # The sheet parsed for schema inference is reused for the upload
+                parsed_chunks = auto_create_table_from_excel(connection, table_name, excel_file_path, sheet_name,
+                                                             sample_rows=args.sample_rows, chunk_rows=args.chunk_rows,
+                                                             use_cache=not args.no_cache)
+            else:
+                table_name = input("Enter the name of the table to upload to: ")
+
+            if args.pipeline:
+                # The insert workers (and the index deferral of --optimize-load) borrow their own connections alongside this one
+                pool.pool_size = max(pool.pool_size, args.insert_workers + 1 + int(args.optimize_load))
+                pipeline_upload_excel_data(pool, table_name, excel_file_path, sheet_name, chunk_rows=args.chunk_rows,
+                                           insert_workers=args.insert_workers, queue_size=args.queue_size,
+                                           load_strategy=args.load_strategy, batch_size=args.batch_size,
+                                           commit_every=args.commit_every, chunks=parsed_chunks,
+                                           use_cache=not args.no_cache, optimize_load=args.optimize_load)
+            else:
+                key = getattr(args, 'key', None)
+                upload_excel_data(connection, table_name, excel_file_path, sheet_name, chunk_rows=args.chunk_rows,
+                                  load_strategy=args.load_strategy, batch_size=args.batch_size, commit_every=args.commit_every,
+                                  chunks=parsed_chunks, use_cache=not args.no_cache,
+                                  resume=getattr(args, 'resume', False), restart=getattr(args, 'restart', False),
+                                  incremental=getattr(args, 'incremental', False),
+                                  key_columns=key.split(',') if key else None, optimize_load=args.optimize_load)
+
+    close_all_pools()
@@ -1,8 +1,19 @@
 # Import necessary libraries
+import numpy as np
 import pandas as pd
-import mysql.connector
 from contextlib import contextmanager
 from decimal import Decimal
+from itertools import chain
+from openpyxl import load_workbook
+from bulkload import create_bulk_loader
+from dialects import MYSQL, dialect_for_connection
+from metrics import span, increment, timed_iter
+from workbookcache import cached_sheet_chunks, read_cached_sheet, hash_file_contents
+from gcstransfer import is_gcs_uri, open_gcs_object, gcs_object_fingerprint
+from schemacache import SCHEMA_CACHE, check_columns_against_table
+from loadmode import LoadOptimizer
+from checkpoint import (ensure_checkpoint_table, read_checkpoint, write_checkpoint, clear_checkpoint,
+                        describe_target, changed_rows, RowHashStore)
 
 @contextmanager
 def mysql_cursor(connection):
@@ -15,7 +26,8 @@ def mysql_cursor(connection):
 # Function to map pandas data types to MySQL data types
 def get_mysql_data_type(pandas_dtype):
     """Maps pandas data types to MySQL data types."""
-    if pandas_dtype.name.startswith('int'):
+    # Nullable integer columns are named Int64 rather than int64
+    if pandas_dtype.name.lower().startswith('int'):
         return 'INT'  # MySQL integer type
     elif pandas_dtype.name.startswith('float'):
         return 'FLOAT'  # or 'DOUBLE' for higher precision
@@ -26,80 +38,419 @@ def get_mysql_data_type(pandas_dtype):
     else:
         return 'VARCHAR(255)'  # Default to VARCHAR for other types
 
+# Rows committed at a time when uploads are checkpointed
+DEFAULT_CHECKPOINT_ROWS = 50000
+
+# Function to format a column name for SQL (replace spaces, etc.)
+def format_column_name(col):
+    return str(col).replace(" ", "_").lower()
+
+# Function to build a CREATE TABLE statement from the structure of a DataFrame
+def build_create_table_sql(table_name, df, sampled=False, dialect=MYSQL):
+    # Generate column definitions
+    column_definitions = []
+    for col in df.columns:
+        formatted_col = format_column_name(col)
+        col_data_type = dialect.column_type(df[col], sampled)
+        column_definitions.append(f"{formatted_col} {col_data_type}")
+
+    # Combine column definitions and complete SQL statement
+    return dialect.create_table_sql(table_name, ', '.join(column_definitions))
+
 # Function to create a MySQL table based on the structure of an Excel file
-def auto_create_table_from_excel(connection, table_name, excel_file_path, sheet_name):
-    try:
-        # Read Excel file into a Pandas DataFrame
-        df = pd.read_excel(excel_file_path, sheet_name=sheet_name)
+def auto_create_table_from_excel(connection, table_name, excel_file_path, sheet_name, sample_rows=None, chunk_rows=None,
+                                 use_cache=True):
+    """Creates a table from the sheet and returns the parsed data so the upload does not read it again.
 
-        # Start creating the SQL statement
-        create_table_sql = f"CREATE TABLE IF NOT EXISTS {table_name} ("
+    The schema is inferred from the first sample_rows rows, or from the whole sheet when sample_rows
+    is not set. With chunk_rows the sheet is streamed and the return value is an iterator of chunks
+    that replays the sampled rows before reading the rest; without it, a list holding one DataFrame.
+    Returns None if the table could not be created.
+    """
+    try:
+        if chunk_rows:
+            # Stream just enough chunks to cover the sample; they are handed on, not read twice
+            chunks = read_sheet_chunks(excel_file_path, sheet_name, chunk_rows, use_cache)
+            sample_target = sample_rows or chunk_rows
+            sampled_chunks = []
+            sampled_row_count = 0
+            for chunk in chunks:
+                sampled_chunks.append(chunk)
+                sampled_row_count += len(chunk)
+                if sampled_row_count >= sample_target:
+                    break
 
-        # Generate column definitions
-        column_definitions = []
-        for col in df.columns:
-            # Format column name for SQL (replace spaces, etc.)
-            formatted_col = str(col).replace(" ", "_").lower()
-            col_data_type = get_mysql_data_type(df[col].dtype)
-            column_definitions.append(f"{formatted_col} {col_data_type}")
+            sample = pd.concat(sampled_chunks, ignore_index=True) if sampled_chunks else pd.DataFrame()
+            parsed = chain(sampled_chunks, chunks)
+            sampled = sampled_row_count >= sample_target
+        else:
+            # Read Excel file into a Pandas DataFrame
+            df = read_excel_sheet(excel_file_path, sheet_name, use_cache)
+            sample = df.head(sample_rows) if sample_rows else df
+            parsed = [df]
+            sampled = len(sample) < len(df)
 
-        # Combine column definitions and complete SQL statement
-        create_table_sql += ', '.join(column_definitions) + ");"
+        sample = sample.head(sample_rows) if sample_rows else sample
+        with span('create_table.infer'):
+            create_table_sql = build_create_table_sql(table_name, sample.dropna(how='all'), sampled,
+                                                      dialect_for_connection(connection))
 
         # Execute the SQL statement to create a new table
-        with mysql_cursor(connection) as cursor:
+        with span('create_table.execute'), mysql_cursor(connection) as cursor:
             cursor.execute(create_table_sql)
             connection.commit()
+        SCHEMA_CACHE.invalidate(connection)
 
         print(f"Table '{table_name}' created successfully.")
+        return parsed
 
     except Exception as e:
         print(f"Error creating table: {e}")
+        return None
+
+# Function to read an Excel sheet in chunks of rows without loading the whole sheet into memory
+def iter_excel_chunks(excel_file_path, sheet_name, chunk_rows):
+    """Yields DataFrames of at most chunk_rows rows from an Excel sheet, read row by row."""
+    # Read-only mode streams rows from the xlsx archive instead of building the full workbook
+    workbook = load_workbook(excel_file_path, read_only=True, data_only=True)
+    try:
+        # Like pd.read_excel, a sheet can be given by name or by position
+        worksheet = workbook.worksheets[sheet_name] if isinstance(sheet_name, int) else workbook[sheet_name]
+        rows = worksheet.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+
+        columns = header_columns(header)
+
+        # The first chunk's dtypes hold for the whole sheet, so every batch binds the same types
+        dtypes = None
+        buffer = []
+        for row in rows:
+            buffer.append(row[:len(columns)])
+            if len(buffer) >= chunk_rows:
+                df = excel_rows_to_dataframe(buffer, columns, dtypes)
+                dtypes = df.dtypes if dtypes is None else dtypes
+                yield df
+                buffer = []
+
+        if buffer:
+            yield excel_rows_to_dataframe(buffer, columns, dtypes)
+
+    finally:
+        workbook.close()
+
+# Function to name the columns of a header row
+def header_columns(header):
+    # Name blank header cells the same way pd.read_excel does
+    return [f"Unnamed: {i}" if name is None else name for i, name in enumerate(header)]
+
+# Function to read only the header row of an Excel sheet
+def read_sheet_header(excel_file_path, sheet_name):
+    if is_gcs_uri(excel_file_path):
+        with open_gcs_object(excel_file_path) as f:
+            return read_sheet_header(f, sheet_name)
+
+    workbook = load_workbook(excel_file_path, read_only=True, data_only=True)
+    try:
+        worksheet = workbook.worksheets[sheet_name] if isinstance(sheet_name, int) else workbook[sheet_name]
+        header = next(worksheet.iter_rows(max_row=1, values_only=True), None)
+        return header_columns(header) if header else []
+    finally:
+        workbook.close()
+
+# Function to check an Excel sheet's headers against an existing table before reading its rows
+def check_sheet_against_table(connection, table_name, excel_file_path, sheet_name):
+    """Returns {header: table column} for headers that differ only in case or spacing; raises ValueError on a mismatch."""
+    with span('upload.validate'):
+        mapping = check_columns_against_table(connection, table_name, read_sheet_header(excel_file_path, sheet_name))
+    return {header: column for header, column in mapping.items() if header != column}
+
+# Function to give every chunk the table's column names
+def rename_chunks(chunks, mapping):
+    for df in chunks:
+        yield df.rename(columns=mapping)
+
+# Function to stream an Excel sheet stored in Google Cloud Storage without copying it to local disk
+def iter_gcs_excel_chunks(uri, sheet_name, chunk_rows):
+    # The object is read in ranges as openpyxl seeks through the archive; the cache is keyed by local files, so it is skipped
+    with open_gcs_object(uri) as f:
+        yield from iter_excel_chunks(f, sheet_name, chunk_rows)
+
+# Function to read an Excel sheet in chunks through the parsed-workbook cache
+def read_sheet_chunks(excel_file_path, sheet_name, chunk_rows, use_cache=True):
+    if is_gcs_uri(excel_file_path):
+        return iter_gcs_excel_chunks(excel_file_path, sheet_name, chunk_rows)
+    return cached_sheet_chunks(excel_file_path, sheet_name, f"openpyxl:{chunk_rows}",
+                               lambda: iter_excel_chunks(excel_file_path, sheet_name, chunk_rows),
+                               use_cache, chunk_rows)
+
+# Function to read a whole Excel sheet through the parsed-workbook cache
+def read_excel_sheet(excel_file_path, sheet_name, use_cache=True):
+    if is_gcs_uri(excel_file_path):
+        with open_gcs_object(excel_file_path) as f:
+            return pd.read_excel(f, sheet_name=sheet_name)
+    return read_cached_sheet(excel_file_path, sheet_name, 'read_excel',
+                             lambda: [pd.read_excel(excel_file_path, sheet_name=sheet_name)],
+                             use_cache)
+
+# Function to build a DataFrame from raw worksheet rows with the dtypes pd.read_excel would give
+def excel_rows_to_dataframe(rows, columns, dtypes=None):
+    """dtypes (those of an earlier chunk of the same sheet) replace the inference for this chunk."""
+    df = pd.DataFrame.from_records(rows, columns=columns)
+    if dtypes is not None:
+        # Text columns keep the cells as read, rather than numbers pandas has turned into floats
+        for position, dtype in enumerate(dtypes):
+            if dtype == object and df.dtypes.iloc[position] != object:
+                df.isetitem(position, pd.Series([row[position] if position < len(row) else None for row in rows],
+                                                dtype=object))
+        return cast_chunk(df, dtypes)
+
+    # openpyxl returns whole numbers as floats; pd.read_excel turns them back into integers
+    for col in df.columns:
+        if df[col].dtype.kind == 'f' and df[col].notna().all() and (df[col] % 1 == 0).all():
+            df[col] = df[col].astype('int64')
+
+    return df
+
+# Function to give a chunk the dtypes of the sheet's first chunk
+def cast_chunk(df, dtypes):
+    """Integer and boolean columns with blanks become their nullable pandas types rather than floats.
+
+    A column is only cast when no value changes: values that do not fit the first chunk's type
+    (10.75 or text in an integer column, say) leave the column as read.
+    """
+    for col, dtype in dtypes.items():
+        series = df[col]
+        if series.dtype == dtype or dtype == object:
+            continue
+        inferred = pd.api.types.infer_dtype(series, skipna=True)
+        nullable = series.isna().any()
+        try:
+            if dtype.kind in 'iu':
+                values = series.dropna()
+                if inferred in ('empty', 'integer') or \
+                        (inferred in ('floating', 'mixed-integer-float') and (values % 1 == 0).all()):
+                    df[col] = series.astype('Int64' if nullable else 'int64')
+            elif dtype.kind == 'b':
+                if inferred in ('empty', 'boolean'):
+                    df[col] = series.astype('boolean' if nullable else 'bool')
+            elif dtype.kind == 'M':
+                # Only blanks and date values; numbers would otherwise be read as epoch offsets
+                if inferred in ('empty', 'datetime', 'datetime64', 'date'):
+                    df[col] = pd.to_datetime(series).astype(dtype)
+            elif dtype.kind == 'f':
+                if inferred in ('empty', 'integer', 'floating', 'mixed-integer-float'):
+                    df[col] = series.astype(dtype)
+        except (TypeError, ValueError, OverflowError):
+            pass
+    return df
+
+# Function to convert one column into a list of values the database driver understands
+def column_to_db_values(series):
+    """Converts a column with whole-column operations instead of per-cell lambdas."""
+    col_type = get_mysql_data_type(series.dtype)
+
+    if col_type == 'INT':
+        # Only nullable (Int64) columns can hold blanks; otherwise the native ints are handed over as they are
+        return series.to_numpy(dtype=object, na_value=None).tolist() if series.hasnans else series.to_numpy().tolist()
+    elif col_type == 'BOOLEAN':
+        # Convert boolean to a format MySQL understands (1 for True, 0 for False)
+        if series.hasnans:
+            return series.astype('Int64').to_numpy(dtype=object, na_value=None).tolist()
+        return series.to_numpy().astype(int).tolist()
+    elif col_type == 'DATETIME':
+        if series.dt.tz is not None:
+            # Format the local wall-clock date, as strftime would
+            series = series.dt.tz_localize(None)
+        # Keep the time (and fractional seconds) when any value has one, so DATETIME columns get it
+        present = series.dropna()
+        if (present.dt.normalize() == present).all():
+            unit = 'D'
+        elif ((present.dt.microsecond != 0) | (present.dt.nanosecond != 0)).any():
+            unit = 'us'
+        else:
+            unit = 's'
+        values = np.char.replace(np.datetime_as_string(series.to_numpy(), unit=unit), 'T', ' ').tolist()
+    elif col_type == 'FLOAT':
+        # numpy renders float64 with the same shortest repr as str(), so the Decimals match value for value
+        values = list(map(Decimal, series.to_numpy(dtype='float64').astype(str).tolist()))
+    else:
+        values = series.to_numpy(dtype=object).tolist()
+
+    # Convert NaN values to None for SQL compatibility
+    for index in np.flatnonzero(series.isna().to_numpy()).tolist():
+        values[index] = None
+
+    return values
+
+# Function to convert a DataFrame into a list of tuples ready for insertion
+def prepare_records(df):
+    columns = [column_to_db_values(df[col]) for col in df.columns]
+    return list(zip(*columns))
+
+# Function to split chunks into pieces of at most max_rows rows
+def split_chunks(chunks, max_rows):
+    for df in chunks:
+        if len(df) <= max_rows:
+            yield df
+            continue
+        for start in range(0, len(df), max_rows):
+            yield df.iloc[start:start + max_rows]
 
 # Function to upload data from an Excel file to a MySQL table
+def upload_excel_data(connection, table_name, excel_file_path, sheet_name, chunk_rows=None,
+                      load_strategy='auto', batch_size=None, commit_every=None, chunks=None, use_cache=True,
+                      resume=False, restart=False, incremental=False, key_columns=None, optimize_load=False):
+    """Uploads a sheet into a table.
 
-def upload_excel_data(connection, table_name, excel_file_path, sheet_name):
+    With resume, each chunk is committed together with a checkpoint row in the target database,
+    so rerunning after a failure carries on after the last committed chunk, and rerunning after
+    success sends nothing. With incremental, only rows that are new or changed since the last
+    upload to this table are sent; key_columns names a unique key, and rows are then upserted so
+    a changed row replaces its old version. restart discards the checkpoint and row history.
+    With optimize_load, the table's secondary indexes and the session's per-row checks are
+    switched off for the load (see LoadOptimizer) and the rows go in as one transaction.
+    """
+    loader = None
+    hash_store = None
+    optimizer = None
     try:
-        # Read Excel file into a Pandas DataFrame
-        df = pd.read_excel(excel_file_path, sheet_name=sheet_name)
-
-        # Remove rows where all elements are NaN (blank lines)
-        df = df.dropna(how='all')
-
-        # Convert data types for each column based on mapping
-        for col in df.columns:
-            col_type = get_mysql_data_type(df[col].dtype)
-            if col_type == 'DATETIME':
-                df[col] = pd.to_datetime(df[col]).dt.strftime('%Y-%m-%d')
-            elif col_type == 'INT':
-                # Ensure numeric columns are formatted correctly (optional, as pandas usually handles this well)
-                df[col] = df[col].apply(lambda x: round(x) if col_type == 'INT' else float(x))
-            elif col_type == 'FLOAT':
-                df[col] = df[col].apply(lambda x: None if pd.isna(x) else Decimal(str(x)))
-            elif col_type == 'BOOLEAN':
-                # Convert boolean to a format MySQL understands (1 for True, 0 for False)
-                df[col] = df[col].astype(int)
-            # Additional data types can be handled here as needed
-
-        # Convert NaN values to None for SQL compatibility
-        df = df.where(pd.notna(df), None)
-
-        # Format column names and create SQL statement
-        columns = ', '.join([f'`{col}`' for col in df.columns])
-        placeholders = ', '.join(['%s'] * len(df.columns))
-        insert_query = f"INSERT INTO {table_name} ({columns}) VALUES ({placeholders});"
-
-        # Create a list of tuples from the DataFrame
-        records = [tuple(row) for row in df.to_records(index=False)]
-
-        with mysql_cursor(connection) as cursor:
-            # Execute the SQL query for insertion
-            print("Insert Query:", insert_query)
-            print("Sample Records:", records[:5])  # Print first 5 records as a sample
-            cursor.executemany(insert_query, records)
-            connection.commit()
+        incremental = incremental or bool(key_columns)
+        checkpointed = resume or incremental
+        if checkpointed or optimize_load:
+            # Progress is recorded per chunk, so commits must line up with chunk boundaries;
+            # an optimized load commits once at the end
+            chunk_rows = chunk_rows or (DEFAULT_CHECKPOINT_ROWS if checkpointed else None)
+            commit_every = None
+
+        if chunks is not None:
+            # Data already parsed by auto_create_table_from_excel
+            pass
+        else:
+            # A sheet that does not fit the table fails here, before any of its rows are parsed
+            column_mapping = check_sheet_against_table(connection, table_name, excel_file_path, sheet_name)
+            if chunk_rows:
+                # Stream the sheet so only one chunk of rows is held in memory at a time
+                chunks = read_sheet_chunks(excel_file_path, sheet_name, chunk_rows, use_cache)
+            else:
+                # Read Excel file into a Pandas DataFrame
+                with span('upload.read'):
+                    chunks = [read_excel_sheet(excel_file_path, sheet_name, use_cache)]
+            if column_mapping:
+                chunks = rename_chunks(chunks, column_mapping)
+
+        if checkpointed:
+            chunks = split_chunks(chunks, chunk_rows)
+
+        skip_rows = 0
+        if resume:
+            if is_gcs_uri(excel_file_path):
+                file_hash = gcs_object_fingerprint(excel_file_path)
+            else:
+                file_hash = hash_file_contents(excel_file_path)
+            ensure_checkpoint_table(connection)
+            if restart:
+                clear_checkpoint(connection, file_hash, sheet_name, table_name)
 
-        print(f"Data uploaded successfully to '{table_name}'.")
+            skip_rows, completed = read_checkpoint(connection, file_hash, sheet_name, table_name)
+            if completed:
+                print(f"'{excel_file_path}' ({sheet_name}) was already uploaded to '{table_name}'; use --restart to upload it again.")
+                return
+            if skip_rows:
+                print(f"Resuming upload to '{table_name}' after {skip_rows} committed rows")
+
+        if incremental:
+            hash_store = RowHashStore()
+            target = describe_target(connection, table_name)
+            if restart:
+                hash_store.clear(target)
+            stored_hashes = hash_store.load(target)
+
+        if optimize_load:
+            optimizer = LoadOptimizer(connection, table_name).start()
+
+        rows_seen = 0
+        total_rows = 0
+
+        for df in timed_iter(chunks, 'upload.read'):
+            # Remove rows where all elements are NaN (blank lines)
+            df = df.dropna(how='all')
+            if df.empty:
+                continue
+
+            # Skip rows a previous run already committed
+            chunk_start = rows_seen
+            rows_seen += len(df)
+            if rows_seen <= skip_rows:
+                continue
+            if chunk_start < skip_rows:
+                df = df.iloc[skip_rows - chunk_start:]
+
+            if loader is None:
+                loader = create_bulk_loader(connection, table_name, df.columns, strategy=load_strategy,
+                                            batch_size=batch_size, commit_every=commit_every,
+                                            upsert=bool(key_columns))
+                print(f"Loading into '{table_name}' using the '{loader.name}' strategy")
+
+            if incremental:
+                with span('upload.hash'):
+                    changed, key_hashes, row_hashes = changed_rows(df, stored_hashes, key_columns)
+                df = df[changed]
+                key_hashes, row_hashes = key_hashes[changed], row_hashes[changed]
+
+            if not df.empty:
+                with span('upload.convert'):
+                    records = prepare_records(df)
+                if total_rows == 0:
+                    print("Sample Records:", records[:5])  # Print first 5 records as a sample
+                with span('upload.insert'):
+                    total_rows += loader.load(records)
+                increment('upload.rows', len(records))
+
+            if checkpointed:
+                if resume:
+                    # Written in the same transaction as the chunk, so the two commit or fail together
+                    write_checkpoint(loader.cursor, file_hash, sheet_name, table_name, rows_seen)
+                loader.commit()
+                if incremental and len(row_hashes):
+                    hash_store.record(target, key_hashes, row_hashes)
+
+        if loader:
+            if resume:
+                write_checkpoint(loader.cursor, file_hash, sheet_name, table_name, rows_seen, completed=True)
+            loader.finish()
+        elif resume:
+            # No loader means nothing was left to send, e.g. a run that stopped between its last commit
+            # and the completion checkpoint; record completion so later runs see the upload as done
+            cursor = connection.cursor()
+            try:
+                write_checkpoint(cursor, file_hash, sheet_name, table_name, rows_seen, completed=True)
+                connection.commit()
+            finally:
+                cursor.close()
+            if skip_rows:
+                print(f"'{excel_file_path}' ({sheet_name}) was already uploaded to '{table_name}'; use --restart to upload it again.")
+                return
+
+        if incremental:
+            print(f"Data uploaded successfully to '{table_name}' ({total_rows} new or changed of {rows_seen - skip_rows} rows).")
+        else:
+            print(f"Data uploaded successfully to '{table_name}' ({total_rows} rows).")
 
     except Exception as e:
         print(f"Error uploading data: {e}")
+        if loader:
+            loader.close()
+        if resume:
+            print("Committed chunks are kept; rerun with --resume to continue from the last one.")
+
+    finally:
+        if optimizer:
+            # Runs after the loader has committed or rolled back, so indexes are rebuilt over the final rows
+            try:
+                optimizer.finish()
+            except Exception as e:
+                print(f"Error restoring '{table_name}' after the load: {e}")
+        if hash_store:
+            hash_store.close()
@@ -0,0 +1,176 @@
+# Import necessary libraries
+import hashlib
+import os
+import shutil
+import tempfile
+import time
+import pandas as pd
+from metrics import increment
+
+try:
+    import pyarrow  # noqa: F401  (only needed for the Parquet format)
+    HAVE_PYARROW = True
+except ImportError:
+    HAVE_PYARROW = False
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "centerspoke", "workbooks")
+DEFAULT_MAX_CACHE_BYTES = 2 * 1024 ** 3
+
+# Entries are written under a staging directory and renamed into place once complete
+STAGING_PREFIX = '.staging-'
+# A staging directory not written to for this long was left behind by a process that was killed
+STALE_STAGING_SECONDS = 24 * 60 * 60
+
+# Function to find the cache directory, which can be moved with CENTERSPOKE_CACHE_DIR
+def get_cache_dir():
+    return os.environ.get("CENTERSPOKE_CACHE_DIR", DEFAULT_CACHE_DIR)
+
+# Function to read the cache size limit, which can be changed with CENTERSPOKE_CACHE_MAX_BYTES
+def get_max_cache_bytes():
+    return int(os.environ.get("CENTERSPOKE_CACHE_MAX_BYTES", DEFAULT_MAX_CACHE_BYTES))
+
+# Function to hash the contents of a file without reading it into memory at once
+def hash_file_contents(file_path, block_size=1024 * 1024):
+    digest = hashlib.blake2b(digest_size=20)
+    with open(file_path, 'rb') as handle:
+        for block in iter(lambda: handle.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+# Function to build the cache key for one sheet of one file as parsed by one reader
+def cache_key(file_path, sheet_name, reader):
+    """Keys on path, size, mtime and content hash so an edited or replaced file never hits a stale entry.
+
+    reader names the parser and its chunking (e.g. 'openpyxl:5000'); readers infer dtypes and split
+    chunks differently, so each gets its own entries.
+    """
+    stat = os.stat(file_path)
+    parts = [os.path.abspath(file_path), str(stat.st_size), str(stat.st_mtime_ns),
+             hash_file_contents(file_path), str(sheet_name), str(reader)]
+    return hashlib.sha256("\0".join(parts).encode('utf-8')).hexdigest()
+
+# Function to write one parsed chunk as a part file
+def write_part(df, part_path):
+    # Parquet needs string column names and one type per column; anything else is pickled
+    if HAVE_PYARROW:
+        try:
+            df.to_parquet(part_path + '.parquet', index=False)
+            return
+        except Exception:
+            if os.path.exists(part_path + '.parquet'):
+                os.remove(part_path + '.parquet')
+    df.to_pickle(part_path + '.pkl')
+
+# Function to read one part file back as DataFrames of at most chunk_rows rows
+def read_part(part_file, chunk_rows=None):
+    if part_file.endswith('.parquet'):
+        if chunk_rows:
+            import pyarrow.parquet as pq
+            for batch in pq.ParquetFile(part_file).iter_batches(batch_size=chunk_rows):
+                yield batch.to_pandas()
+            return
+        yield pd.read_parquet(part_file)
+        return
+
+    df = pd.read_pickle(part_file)
+    if not chunk_rows:
+        yield df
+        return
+    for start in range(0, len(df), chunk_rows):
+        yield df.iloc[start:start + chunk_rows].reset_index(drop=True)
+
+# Function to list an entry's part files in the order they were written
+def list_parts(entry_dir):
+    return [os.path.join(entry_dir, name) for name in sorted(os.listdir(entry_dir)) if name.startswith('part-')]
+
+# Function to get the size of everything under a directory
+def directory_size(path):
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            total += os.path.getsize(os.path.join(root, name))
+    return total
+
+# Function to remove least recently used entries until the cache fits its size limit, and abandoned staging directories
+def evict_cache(cache_dir=None, max_bytes=None):
+    cache_dir = cache_dir or get_cache_dir()
+    max_bytes = get_max_cache_bytes() if max_bytes is None else max_bytes
+    if not os.path.isdir(cache_dir):
+        return
+
+    entries = []
+    stale_before = time.time() - STALE_STAGING_SECONDS
+    for name in os.listdir(cache_dir):
+        entry_dir = os.path.join(cache_dir, name)
+        if not os.path.isdir(entry_dir):
+            continue
+        if name.startswith(STAGING_PREFIX):
+            # Writing a part touches the staging directory, so only abandoned ones get this old
+            if os.path.getmtime(entry_dir) < stale_before:
+                shutil.rmtree(entry_dir, ignore_errors=True)
+        elif not name.startswith('.'):
+            # Reading an entry touches its directory, so mtime is its last use
+            entries.append((os.path.getmtime(entry_dir), directory_size(entry_dir), entry_dir))
+
+    total = sum(size for _, size, _ in entries)
+    for _, size, entry_dir in sorted(entries):
+        if total <= max_bytes:
+            break
+        shutil.rmtree(entry_dir, ignore_errors=True)
+        total -= size
+
+# Function to remove every cached workbook
+def clear_cache(cache_dir=None):
+    shutil.rmtree(cache_dir or get_cache_dir(), ignore_errors=True)
+
+# Function to yield parsed chunks of a sheet from the cache, parsing and caching it on a miss
+def cached_sheet_chunks(file_path, sheet_name, reader, read_chunks, use_cache=True, chunk_rows=None):
+    """Yields the DataFrames produced by read_chunks(), serving them from disk when the file is unchanged.
+
+    reader identifies read_chunks in the cache key (see cache_key). read_chunks is a callable returning an iterable of DataFrames for the sheet. On a miss each chunk
+    is written as a part file as it goes past, and the entry only becomes visible once the whole
+    sheet has been read, so an interrupted read never leaves a partial entry behind. On a hit,
+    chunk_rows re-splits the cached parts so streaming readers keep their memory bound.
+    """
+    if not use_cache:
+        increment('read.bytes', os.path.getsize(file_path))
+        yield from read_chunks()
+        return
+
+    cache_dir = get_cache_dir()
+    entry_dir = os.path.join(cache_dir, cache_key(file_path, sheet_name, reader))
+
+    if os.path.isdir(entry_dir):
+        # Mark the entry as recently used for LRU eviction
+        os.utime(entry_dir)
+        increment('cache.hits')
+        for part_file in list_parts(entry_dir):
+            yield from read_part(part_file, chunk_rows)
+        return
+
+    increment('cache.misses')
+    increment('read.bytes', os.path.getsize(file_path))
+    os.makedirs(cache_dir, exist_ok=True)
+    staging_dir = tempfile.mkdtemp(prefix=STAGING_PREFIX, dir=cache_dir)
+    try:
+        for index, df in enumerate(read_chunks()):
+            write_part(df, os.path.join(staging_dir, f"part-{index:06d}"))
+            yield df
+
+        try:
+            os.rename(staging_dir, entry_dir)
+        except OSError:
+            # Another process cached the same sheet first
+            pass
+
+    finally:
+        shutil.rmtree(staging_dir, ignore_errors=True)
+
+    evict_cache(cache_dir)
+
+# Function to read a whole sheet through the cache as one DataFrame
+def read_cached_sheet(file_path, sheet_name, reader, read_chunks, use_cache=True):
+    chunks = list(cached_sheet_chunks(file_path, sheet_name, reader, read_chunks, use_cache))
+    if len(chunks) == 1:
+        return chunks[0]
+    return pd.concat(chunks, ignore_index=True)